@@ -1,4 +1,8 @@
+from typing import List, Dict, Set, Any, Optional, Tuple, Literal, Callable, Union, Iterable, Iterator
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import os
 
 import numpy as np
 import torch
@@ -44,21 +48,142 @@ class TimeseriesFeatureExtractor(ABC, TransformerMixin, BaseEstimator):
         pass
 
     
-    def transform(self, X: Tensor) -> Tensor:
+    def transform(
+            self, 
+            X: Tensor,
+            out: Optional[Union[Tensor, np.ndarray]] = None,
+            n_jobs: int = 1,
+        ) -> Union[Tensor, np.ndarray]:
         """Transform the input time series data into features. Splits the
-        data into sub-batches if necessary based on 'self.max_batch'.
+        data into sub-batches if necessary based on 'self.max_batch'. Each
+        chunk is written directly into the output, which is allocated from
+        the shape of the first chunk unless 'out' is given, hence 'out' is
+        required if X is empty. If n_jobs != 1, the chunks are dispatched 
+        to a persistent pool of worker threads, which share the fitted 
+        state of the extractor and write their results into the disjoint
+        rows of the shared output.
 
         Args:
             X (Tensor): Batched time series tensor of shape (N,T,D)
+            out (Optional[Union[Tensor, np.ndarray]]): Preallocated output 
+                buffer of shape (N, ...), for instance a np.memmap.
+            n_jobs (int): Number of worker threads. -1 uses all cores.
 
         Returns:
-            (Tensor): Feature vectors of shape (N, ...)
+            (Union[Tensor, np.ndarray]): Feature vectors of shape (N, ...),
+                written into 'out' if given.
         """
-        split_X = torch.split(X, self.max_batch, dim=0)
-        return torch.cat(
-            [self._batched_transform(x) for x in split_X],
-            axis=0
-            )
+        N = X.shape[0]
+        starts = list(range(0, N, self.max_batch))
+        if out is None and not starts:
+            raise ValueError("Cannot infer the feature shape from an empty X. "
+                             "Pass a preallocated 'out' of shape (0, ...).")
+        if out is None:
+            features = self._batched_transform(X[:self.max_batch])
+            out = torch.empty((N,) + features.shape[1:],
+                              dtype=features.dtype,
+                              device=features.device)
+            write_chunk(out, 0, features)
+            starts = starts[1:]
+
+        def transform_chunk(i: int):
+            self._transform_into(X[i:i+self.max_batch], out, i)
+
+        if n_jobs == 1:
+            for i in starts:
+                transform_chunk(i)
+        else:
+            pool = thread_pool(n_jobs if n_jobs > 0 else os.cpu_count())
+            futures = [pool.submit(transform_chunk, i) for i in starts]
+            for future in futures:
+                future.result()
+        return out
+
+
+    def _transform_into(
+            self,
+            X: Tensor,
+            out: Union[Tensor, np.ndarray],
+            i: int,
+        ):
+        """Transforms a chunk and writes the features into the rows
+        out[i:i+len(X)]. Subclasses may override this to write into
+        the output without allocating the features of the chunk.
+
+        Args:
+            X (Tensor): Batched time series tensor of shape (n,T,D)
+            out (Union[Tensor, np.ndarray]): Output buffer of shape (N, ...).
+            i (int): Index of the first row to write.
+        """
+        write_chunk(out, i, self._batched_transform(X))
+
+
+    def transform_iter(
+            self,
+            X: Iterable[Union[Tensor, np.ndarray]],
+            dtype: Optional[torch.dtype] = None,
+            device: Optional[Union[str, torch.device]] = None,
+        ) -> Iterator[Tensor]:
+        """Lazily transforms a stream of time series. The items of 'X' are
+        either single time series of shape (T,D) or batches of shape 
+        (n,T,D), which are assembled into chunks of 'self.max_batch' series.
+        Features are yielded one chunk at a time, such that memory is 
+        bounded by a single chunk regardless of the length of the stream.
+
+        Args:
+            X (Iterable[Union[Tensor, np.ndarray]]): Iterable of arrays or
+                tensors of shape (T,D) or (n,T,D).
+            dtype (Optional[torch.dtype]): Dtype to convert the inputs to.
+            device (Optional[Union[str, torch.device]]): Device to move
+                the inputs to.
+
+        Yields:
+            (Tensor): Feature vectors of shape (max_batch, ...), where the
+                last chunk may be smaller.
+        """
+        buffer, n_buffered = [], 0
+        for x in X:
+            x = torch.as_tensor(x, dtype=dtype, device=device)
+            if x.ndim == 2:
+                x = x.unsqueeze(0)
+            while x.shape[0] > 0:
+                n_take = min(self.max_batch - n_buffered, x.shape[0])
+                buffer.append(x[:n_take])
+                n_buffered += n_take
+                x = x[n_take:]
+                if n_buffered == self.max_batch:
+                    yield self._batched_transform(torch.cat(buffer, dim=0))
+                    buffer, n_buffered = [], 0
+        if buffer:
+            yield self._batched_transform(torch.cat(buffer, dim=0))
+
+
+
+@lru_cache(maxsize=None)
+def thread_pool(n_jobs: int) -> ThreadPoolExecutor:
+    """Returns a persistent pool of 'n_jobs' worker threads, shared 
+    across calls. PyTorch releases the GIL inside its operators, 
+    including TorchScript functions, so the threads run in parallel."""
+    return ThreadPoolExecutor(max_workers=n_jobs)
+
+
+
+def write_chunk(
+        out: Union[Tensor, np.ndarray],
+        i: int,
+        features: Tensor,
+    ):
+    """Writes 'features' into the rows out[i:i+len(features)].
+
+    Args:
+        out (Union[Tensor, np.ndarray]): Output buffer of shape (N, ...).
+        i (int): Index of the first row to write.
+        features (Tensor): Features of shape (n, ...).
+    """
+    if isinstance(out, np.ndarray):
+        out[i:i+features.shape[0]] = features.detach().cpu().numpy()
+    else:
+        out[i:i+features.shape[0]] = features
 
 
 
@@ -0,0 +1,202 @@
+from typing import List, Dict, Set, Any, Optional, Tuple, Literal, Callable, Union
+import hashlib
+import os
+
+import numpy as np
+import torch
+from torch import Tensor
+
+from base import TimeseriesFeatureExtractor
+
+
+def hash_tensor(X: Union[Tensor, np.ndarray]) -> str:
+    """Content hash of the shape, dtype and values of an array.
+
+    Args:
+        X (Union[Tensor, np.ndarray]): Array of any shape.
+
+    Returns:
+        str: Hexadecimal digest.
+    """
+    if isinstance(X, Tensor):
+        X = X.detach().cpu().numpy()
+    X = np.ascontiguousarray(X)
+    h = hashlib.blake2b(digest_size=20)
+    h.update(repr((X.shape, X.dtype.str)).encode())
+    h.update(memoryview(X).cast("B"))
+    return h.hexdigest()
+
+
+
+def stable_repr(value: Any) -> str:
+    """Representation of a hyperparameter which is stable across runs,
+    unlike the default repr of objects which contains memory addresses.
+    Objects such as static kernels are represented by their class name
+    and attributes."""
+    if isinstance(value, (bool, int, float, str, type(None))):
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(stable_repr(v) for v in value) + "]"
+    if isinstance(value, dict):
+        return "{" + ",".join(f"{k}:{stable_repr(value[k])}" for k in sorted(value)) + "}"
+    if isinstance(value, (Tensor, np.ndarray)):
+        return hash_tensor(value)
+    if hasattr(value, "__dict__"):
+        return type(value).__name__ + stable_repr(vars(value))
+    return repr(value)
+
+
+
+class CachedFeatureExtractor(TimeseriesFeatureExtractor):
+    def __init__(
+            self,
+            extractor: TimeseriesFeatureExtractor,
+            cache_dir: str = os.path.join("~", ".cache", "zephyrox", "features"),
+            max_size_gb: float = 10.0,
+        ):
+        """
+        Content-addressed on-disk cache around the 'fit' and 'transform' of
+        a feature extractor. Features are stored as .npy files keyed by the
+        extractor class, its hyperparameters, the random state at fit time,
+        and hashes of the fit and transform data, and are loaded back as
+        memory maps. Fitting is deferred until a cache miss, such that
+        repeated runs skip both 'fit' and 'transform'. The least recently
+        used files are evicted when the cache exceeds 'max_size_gb'.
+
+        Extractors with a 'seed' hyperparameter set to None are seeded
+        nondeterministically, and are never cached. For extractors without
+        a 'seed' hyperparameter, the global torch random state at the time
+        of 'fit' is part of the key, and is restored for the deferred fit.
+
+        Args:
+            extractor (TimeseriesFeatureExtractor): Feature extractor to cache.
+            cache_dir (str): Directory of the cache.
+            max_size_gb (float): Max total size of the cache in gigabytes.
+        """
+        super().__init__(extractor.max_batch)
+        self.extractor = extractor
+        self.cache_dir = cache_dir
+        self.max_size_gb = max_size_gb
+
+
+    @property
+    def cacheable(self) -> bool:
+        """False if the extractor is seeded nondeterministically."""
+        params = self.extractor.get_params(deep=False)
+        return not ("seed" in params and params["seed"] is None)
+
+
+    def fit(self, X: Tensor, y=None):
+        """Records the fit data, its hash and the random state. The
+        extractor itself is only fitted on the first cache miss.
+
+        Args:
+            X (Tensor): Batched time series data of shape (N, T, D).
+        """
+        params = self.extractor.get_params(deep=False)
+        params.pop("max_batch", None)
+        self.X_fit = X
+        self.y_fit = y
+        self.rng_state = torch.get_rng_state()
+        self.cuda_rng_state = torch.cuda.get_rng_state_all() if torch.cuda.is_available() else None
+        key = [type(self.extractor).__module__,
+               type(self.extractor).__name__,
+               stable_repr(params),
+               hash_tensor(X),
+               hash_tensor(y) if y is not None else "None"]
+        if "seed" not in params:
+            key.append(hash_tensor(self.rng_state))
+        self.fit_key = "|".join(key)
+        self.extractor_is_fitted = False
+        return self
+
+
+    def _fit_extractor(self):
+        """Fits the extractor with the random state recorded in 'fit'."""
+        if self.extractor_is_fitted:
+            return
+        with torch.random.fork_rng():
+            torch.set_rng_state(self.rng_state)
+            if self.cuda_rng_state is not None:
+                torch.cuda.set_rng_state_all(self.cuda_rng_state)
+            if self.y_fit is None:
+                self.extractor.fit(self.X_fit)
+            else:
+                self.extractor.fit(self.X_fit, self.y_fit)
+        self.extractor_is_fitted = True
+
+
+    def _batched_transform(self, X: Tensor) -> Tensor:
+        self._fit_extractor()
+        return self.extractor._batched_transform(X)
+
+
+    def transform(
+            self,
+            X: Tensor,
+            out: Optional[Union[Tensor, np.ndarray]] = None,
+            n_jobs: int = 1,
+        ) -> Union[Tensor, np.ndarray]:
+        """Loads the features of X from the cache if present, else computes
+        and stores them. Cached features are memory mapped copy-on-write,
+        so they are only read from disk on access.
+
+        Args:
+            X (Tensor): Batched time series tensor of shape (N,T,D)
+            out (Optional[Union[Tensor, np.ndarray]]): Preallocated output
+                buffer of shape (N, ...), for instance a np.memmap.
+            n_jobs (int): Number of worker threads on a cache miss.
+
+        Returns:
+            (Union[Tensor, np.ndarray]): Feature vectors of shape (N, ...),
+                written into 'out' if given.
+        """
+        if not self.cacheable:
+            self._fit_extractor()
+            return self.extractor.transform(X, out, n_jobs)
+
+        cache_dir = os.path.expanduser(self.cache_dir)
+        key = hashlib.sha1(f"{self.fit_key}|{hash_tensor(X)}".encode()).hexdigest()
+        path = os.path.join(cache_dir, key + ".npy")
+
+        # cache hit
+        if os.path.exists(path):
+            os.utime(path)
+            features = np.load(path, mmap_mode="c")
+            if out is None:
+                return torch.from_numpy(features).to(X.device)
+            if isinstance(out, np.ndarray):
+                out[:] = features
+            else:
+                out.copy_(torch.from_numpy(features))
+            return out
+
+        # cache miss. Write to a temporary file, then move atomically
+        self._fit_extractor()
+        features = self.extractor.transform(X, out, n_jobs)
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = path + f".{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, features if isinstance(features, np.ndarray)
+                    else features.detach().cpu().numpy())
+        os.replace(tmp_path, path)
+        self._evict(cache_dir)
+        return features
+
+
+    def _evict(self, cache_dir: str):
+        """Deletes the least recently used .npy files until the total
+        size of the cache is at most 'self.max_size_gb'."""
+        files = []
+        for name in os.listdir(cache_dir):
+            if name.endswith(".npy"):
+                stat = os.stat(os.path.join(cache_dir, name))
+                files.append((stat.st_mtime, stat.st_size, name))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        max_bytes = self.max_size_gb * 2**30
+        for _, size, name in files:
+            if total <= max_bytes:
+                break
+            os.remove(os.path.join(cache_dir, name))
+            total -= size
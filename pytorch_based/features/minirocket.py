@@ -0,0 +1,184 @@
+from typing import List, Dict, Set, Any, Optional, Tuple, Literal, Callable
+from itertools import combinations
+import numpy as np
+import torch
+import torch.nn.functional as F
+from torch import Tensor
+
+from base import TimeseriesFeatureExtractor
+
+
+def minirocket_kernel_outputs(
+        X: Tensor,
+        channel_masks: Tensor,
+        position_masks: Tensor,
+        dilation: int,
+    ) -> Tensor:
+    """Outputs of the 84 MiniRocket kernels of length 9 with weights -1
+    and 2, where the three positions with weight 2 run over all subsets of
+    size 3. Each output is -A + 3 * (G_a + G_b + G_c), where G_j is the input
+    shifted by (j-4)*dilation and A = G_0 + ... + G_8 is shared by all
+    kernels, such that no multiplications with the weights are needed.
+
+    Args:
+        X (Tensor): Shape (N, D, T).
+        channel_masks (Tensor): Shape (84, D). Channels summed by each kernel.
+        position_masks (Tensor): Boolean tensor of shape (9, 84), where
+            position_masks[j, k] is True if kernel k has weight 2 at j.
+        dilation (int): Dilation of the kernels.
+
+    Returns:
+        Tensor: Shape (N, 84, T) of "same" zero padded outputs.
+    """
+    N, D, T = X.shape
+    Z = channel_masks @ X if D > 1 else X #shape (N, 84, T) or (N, 1, T)
+    Z = F.pad(Z, (4*dilation, 4*dilation))
+
+    # A = sum of all 9 shifted copies, shared by all kernels
+    A = Z[..., 0:T].clone()
+    for j in range(1, 9):
+        A += Z[..., j*dilation:j*dilation+T]
+    out = (-A).expand(N, position_masks.shape[1], T).clone()
+
+    # add 3 times the shifted copies at the positions with weight 2
+    for j in range(9):
+        G_j = Z[..., j*dilation:j*dilation+T]
+        sel = position_masks[j]
+        out[:, sel] += 3 * (G_j[:, sel] if D > 1 else G_j)
+    return out
+
+
+
+def multi_bias_ppv(
+        H: Tensor,
+        biases: Tensor,
+    ) -> Tensor:
+    """Proportion of positive values mean_t [H_t > b] of each kernel output
+    for several biases b. Each output value is located among the sorted 
+    biases of its kernel by binary search, and the PPV of every bias is read
+    off a cumulative histogram of these locations. This is a single pass 
+    over time with O(log n_biases) work per value, instead of one pass over
+    time per bias.
+
+    Args:
+        H (Tensor): Kernel outputs of shape (N, K, T).
+        biases (Tensor): Biases of shape (K, n_biases), sorted in
+            ascending order along the last dimension.
+
+    Returns:
+        Tensor: Shape (N, K, n_biases).
+    """
+    N, K, T = H.shape
+    n_biases = biases.shape[-1]
+    idx = torch.searchsorted(biases.expand(N, K, n_biases).contiguous(), H.contiguous()) # number of biases < H_t
+    counts = torch.zeros(N, K, n_biases+1, device=H.device, dtype=H.dtype)
+    counts.scatter_add_(-1, idx, torch.ones_like(H))
+    n_greater = counts.flip(-1).cumsum(-1).flip(-1)[..., 1:] # H_t > b_j iff idx > j
+    return n_greater / T
+
+
+
+class MiniRocketOwn(TimeseriesFeatureExtractor):
+    def __init__(
+            self,
+            n_features: int = 10000,
+            max_dilations: int = 32,
+            seed: Optional[int] = None,
+            max_batch: int = 512,
+        ):
+        """
+        Native PyTorch MiniRocket-style features, see
+        https://arxiv.org/abs/2012.08791. Uses the 84 fixed kernels with
+        weights in {-1, 2} at dilations 2^0, ..., 2^max_exponent. Kernel
+        outputs are computed from shared sums of the shifted input, see
+        'minirocket_kernel_outputs', and pooled with PPV for several biases
+        per kernel, see 'multi_bias_ppv'. The biases are quantiles of the
+        output of each kernel on a random training example, at the
+        low-discrepancy levels frac((i+1) * golden_ratio). For multivariate
+        series, each kernel sums a random subset of the channels.
+
+        Args:
+            n_features (int): Approximate number of features.
+            max_dilations (int): Max number of dilations.
+            seed (Optional[int]): Seed for the random initialization.
+            max_batch (int): Maximum batch size for computations.
+        """
+        super().__init__(max_batch)
+        self.n_features = n_features
+        self.max_dilations = max_dilations
+        self.seed = seed
+
+
+    def fit(self, X: Tensor, y=None):
+        """
+        Chooses the dilations, channel subsets and biases.
+
+        Args:
+            X (Tensor): Training data of shape (N, T, D).
+        """
+        N, T, D = X.shape
+        device = X.device
+        dtype = X.dtype
+        gen = torch.Generator(device=device)
+        if self.seed is not None:
+            gen.manual_seed(self.seed)
+        else:
+            gen.seed()
+
+        # dilations and number of biases per kernel
+        max_exponent = max(int(np.floor(np.log2((T-1) / 8))), 0)
+        self.dilations = [2**i for i in range(min(max_exponent+1, self.max_dilations))]
+        n_dil = len(self.dilations)
+        self.n_biases = max(1, self.n_features // (84 * n_dil))
+
+        # positions with weight 2 of the 84 kernels
+        positions = torch.tensor(list(combinations(range(9), 3)), device=device)
+        self.position_masks = torch.zeros(9, 84, dtype=torch.bool, device=device)
+        self.position_masks[positions, torch.arange(84, device=device)[:, None]] = True
+
+        # random channel subsets of size 1, ..., min(D, 9)
+        sizes = torch.randint(1, min(D, 9)+1, (n_dil, 84), generator=gen, device=device)
+        ranks = torch.rand(n_dil, 84, D, generator=gen, device=device).argsort(dim=-1).argsort(dim=-1)
+        self.channel_masks = (ranks < sizes[..., None]).to(dtype)
+
+        # low-discrepancy quantiles of the output on random examples
+        golden = (np.sqrt(5) + 1) / 2
+        levels = torch.arange(1, n_dil*84*self.n_biases + 1, device=device, dtype=dtype)
+        quantiles = torch.frac(levels * golden).reshape(n_dil, 84, self.n_biases)
+        X = X.permute(0, 2, 1)
+        biases = []
+        for i, dilation in enumerate(self.dilations):
+            idx = torch.randint(N, (84,), generator=gen, device=device)
+            H = minirocket_kernel_outputs(X[idx], self.channel_masks[i],
+                                          self.position_masks, dilation)
+            H = H[torch.arange(84, device=device), torch.arange(84, device=device)] #shape (84, T)
+            H_sorted = H.sort(dim=-1).values
+            pos = quantiles[i] * (T-1)
+            lo, hi = pos.floor().long(), pos.ceil().long()
+            q_lo, q_hi = H_sorted.gather(1, lo), H_sorted.gather(1, hi)
+            biases.append(q_lo + (pos - lo) * (q_hi - q_lo))
+        self.biases = torch.stack(biases).sort(dim=-1).values #shape (n_dil, 84, n_biases)
+        return self
+
+
+    def _batched_transform(
+            self,
+            X: Tensor,
+        ):
+        """
+        Computes the MiniRocket-style features.
+
+        Args:
+            X (Tensor): Tensor of shape (N, T, D).
+
+        Returns:
+            Tensor: Tensor of shape (N, n_dilations * 84 * n_biases).
+        """
+        N = X.shape[0]
+        X = X.permute(0, 2, 1)
+        features = []
+        for i, dilation in enumerate(self.dilations):
+            H = minirocket_kernel_outputs(X, self.channel_masks[i],
+                                          self.position_masks, dilation)
+            features.append(multi_bias_ppv(H, self.biases[i]))
+        return torch.stack(features, dim=1).reshape(N, -1)
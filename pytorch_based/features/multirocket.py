@@ -6,6 +6,7 @@ from torch import Tensor
 import numpy as np
 
 from base import TimeseriesFeatureExtractor
+from rocket_convs import sampled_conv_quantiles, dilated_conv_chunks, DEFAULT_KERNEL_CHUNK
 
 
 
@@ -45,9 +46,74 @@ def four_multirocket_pooling(X: Tensor) -> Tensor:
 
 
 
+@torch.jit.script
+def four_multirocket_pooling_fused(X: Tensor) -> Tensor:
+    """4 pooling mechanisms used by MultiRocket, computed in a single
+    sweep over time with 5 running statistics per channel: the count,
+    sum and index sum of positive values, and the current and longest
+    stretch of positive values. Uses O(N*D) extra memory instead of 
+    several (N, D, T) temporaries. The loop launches about 7*T small 
+    kernels, which is fast on CPU but slow on GPU.
+
+    The LSPV differs from 'four_multirocket_pooling' at one edge case: 
+    a stretch of positive values ending at t=0 is counted here but not 
+    there. Hence if X[n, d, 0] > 0 is the only positive value, the LSPV
+    is 1/T here and 0 there. All other outputs are identical.
+
+    Args:
+        X (Tensor): Features of shape (N, D, T)
+
+    Returns:
+        Tensor: Pooled features of shape (N, 4*D)
+    """
+    N, D, T = X.shape
+    count = torch.zeros(N, D, device=X.device, dtype=X.dtype)
+    pos_sum = torch.zeros_like(count)
+    idx_sum = torch.zeros_like(count)
+    run = torch.zeros_like(count)
+    max_run = torch.zeros_like(count)
+    for t in range(T):
+        x = X[:, :, t]
+        pos = (x > 0).to(X.dtype)
+        count.add_(pos)
+        pos_sum.add_(x * pos)
+        idx_sum.add_(pos, alpha=t+1)
+        run.add_(1).mul_(pos)
+        torch.maximum(max_run, run, out=max_run)
+    return torch.cat([count / T, pos_sum / T, idx_sum / T**2, max_run / T], dim=-1)
+
+
+
 class MultiRocketFeatures(nn.Module):
-    def __init__(self, D, T, n_features, kernel_length=9):
+    def __init__(self, D, T, n_features, kernel_length=9, kernel_chunk=DEFAULT_KERNEL_CHUNK,
+                 mode="conv", pooling="auto"):
+        """MultiRocket convolutions with dilations 2^0, ..., 2^max_exponent,
+        followed by the 4 MultiRocket pooling operations.
+
+        Args:
+            D (int): Number of input channels.
+            T (int): Length of the time series.
+            n_features (int): Approximate number of output features.
+            kernel_length (int): Length of the convolution kernels.
+            kernel_chunk (Optional[int]): Max number of kernels convolved 
+                and pooled at a time in 'forward' and 'init_biases', such 
+                that peak activation memory does not grow with n_features.
+                If None, "conv" mode pools all kernels of one dilation at
+                a time.
+            mode (Literal["conv", "unfold", "fft"]): Executes one Conv1d per
+                dilation ("conv"), or all dilations at once as a batched
+                GEMM ("unfold") or in the Fourier domain ("fft"), see
+                'dilated_conv_chunks'.
+            pooling (Literal["auto", "fused", "vectorized"]): Computes the
+                pooling with the time loop 'four_multirocket_pooling_fused'
+                or with 'four_multirocket_pooling'. "auto" uses the
+                vectorized version for CUDA inputs and the fused version
+                otherwise.
+        """
         super().__init__()
+        self.kernel_chunk = kernel_chunk
+        self.mode = mode
+        self.pooling = pooling
 
         max_exponent = np.floor(np.log2((T - 1) / (kernel_length- 1))).astype(np.int64)
         max_exponent = max(max_exponent, 0)
@@ -68,54 +134,91 @@ class MultiRocketFeatures(nn.Module):
         )
 
     
-    def init_biases(self, X: Tensor, chunk_size: int=1000):
+    def init_biases(self, X: Tensor, chunk_size: int=1000, n_samples: int=2000):
         """Initializes the biases of the convolutional layers,
-        using the quantiles of the data. Assumes the data to
-        be shuffled.
-
-        WARNING: Slow even for 10 points, 10 000 kernels, T=113. (1.3s elapsed)
+        using random quantiles of the convolution outputs on the 
+        data, estimated from a sample of about 'n_samples' outputs 
+        per kernel, see 'sampled_conv_quantiles'.
 
         Args:
             X (Tensor): Shape (N, D, T).
             chunk_size (int): Batch size for computations
+            n_samples (int): Number of sampled outputs per kernel.
         """
         with torch.no_grad():
-            # first set the biases to zero
             for conv in self.convs:
-                conv.bias.data.zero_()
+                quantiles = 0.8 * torch.rand(conv.out_channels, device=X.device) + 0.1
+                conv.bias.data = sampled_conv_quantiles(conv, X, quantiles, chunk_size, 
+                                                        n_samples, self.kernel_chunk)
 
-            #obtain output
-            out_per_conv = [conv(X.float()) for conv in self.convs]
+        return self
 
-            #initalize bias using random quantiles
-            for out, conv in zip(out_per_conv, self.convs):
-                #out: (N, n_kernels_per_dilation, T)
-                n_ker_per_dil = out.shape[1]
-                quantiles = 0.8 * torch.rand(n_ker_per_dil, device=X.device) + 0.1
-                q = torch.quantile(out.permute(0,2,1).reshape(-1, n_ker_per_dil), quantiles, dim=0)
-                conv.bias.data = torch.diag(q)
 
-        return self
+    def _pool(self, h: Tensor) -> Tensor:
+        """Pools the activations h of shape (N, k, T) to shape (N, 4*k)
+        with the implementation selected by 'self.pooling'."""
+        pooling = self.pooling
+        if pooling == "auto":
+            pooling = "vectorized" if h.is_cuda else "fused"
+        if pooling == "fused":
+            return four_multirocket_pooling_fused(h)
+        return four_multirocket_pooling(h)
 
     
-    def forward(self, x): # can be made more memory efficient, as we don't need to store all the intermediate results
-        # x: (N, D, T)
-        x = [conv(x) for conv in self.convs]
-        x = torch.cat(x, dim=1)
-        x = four_multirocket_pooling(x)
-        return x
+    def forward(self, x):
+        """Convolves and pools the kernels in groups of at most
+        'self.kernel_chunk', such that only the activations of one group
+        of shape (N, kernel_chunk, T) are alive at a time. With the fused
+        pooling, the LSPV of a kernel whose only positive activation is at
+        t=0 is 1/T instead of 0, see 'four_multirocket_pooling_fused'.
+
+        Args:
+            x (Tensor): Shape (N, D, T).
+
+        Returns:
+            Tensor: Shape (N, 4*n_kernels), ordered as [ppv, mpv, mipv, lspv]
+                of all kernels.
+        """
+        N = x.shape[0]
+        out = torch.empty(N, 4, self.n_kernels, device=x.device, dtype=x.dtype)
+        if self.mode != "conv":
+            n_dil = len(self.convs)
+            out_dil = out.view(N, 4, n_dil, -1)
+            for c0, c1, h in dilated_conv_chunks(self.convs, x, self.mode, self.kernel_chunk):
+                pooled = self._pool(h.reshape(N, n_dil*(c1-c0), -1))
+                out_dil[:, :, :, c0:c1] = pooled.reshape(N, 4, n_dil, c1-c0)
+            return out.reshape(N, -1)
+
+        i = 0
+        for conv in self.convs:
+            n_out = conv.out_channels
+            chunk = self.kernel_chunk or n_out
+            for c0 in range(0, n_out, chunk):
+                c1 = min(c0 + chunk, n_out)
+                h = F.conv1d(x, conv.weight[c0:c1], conv.bias[c0:c1],
+                             dilation=conv.dilation, padding=conv.padding)
+                out[:, :, i:i+c1-c0] = self._pool(h).reshape(N, 4, c1-c0)
+                i += c1-c0
+        return out.reshape(N, -1)
     
 
 class MultiRocketOwn(TimeseriesFeatureExtractor):
-    def __init__(self, n_features, max_batch=512):
+    def __init__(self, n_features, kernel_chunk=DEFAULT_KERNEL_CHUNK, mode="conv", pooling="auto",
+                 max_batch=512):
         super().__init__(max_batch)
         self.n_features = n_features
+        self.kernel_chunk = kernel_chunk
+        self.mode = mode
+        self.pooling = pooling
 
 
     def fit(self, X: Tensor, y=None):
         """ creates the MultiRocketFeatures object and initializes it"""
         N, T, D = X.shape
-        self.model = MultiRocketFeatures(D, T, self.n_features).to(X.device)
+        self.model = MultiRocketFeatures(D, T, self.n_features, 
+                                         kernel_chunk=self.kernel_chunk,
+                                         mode=self.mode,
+                                         pooling=self.pooling).to(X.device)
         self.model.init_biases(X[0:1].permute(0,2,1))
         return self
 
@@ -124,4 +227,19 @@ class MultiRocketOwn(TimeseriesFeatureExtractor):
             self,
             X:Tensor,
         ):
-        return self.model(X.permute(0,2,1))
\ No newline at end of file
+        return self.model(X.permute(0,2,1))
+
+
+
+if __name__ == "__main__":
+    # benchmark of the fused pooling against the vectorized pooling
+    import time
+    for N, D, T in [(64, 100, 100), (64, 1000, 500), (16, 2000, 1000)]:
+        X = torch.randn(N, D, T)
+        four_multirocket_pooling_fused(X) # warmup TorchScript
+        for name, pool in [("vectorized", four_multirocket_pooling), 
+                           ("fused", four_multirocket_pooling_fused)]:
+            start = time.perf_counter()
+            out = pool(X)
+            elapsed = time.perf_counter() - start
+            print(f"N={N}, D={D}, T={T}, {name}: {elapsed:.4f}s")
@@ -4,6 +4,7 @@ import torch
 from torch import Tensor
 
 from base import TimeseriesFeatureExtractor
+from random_projections import draw_projection, apply_projection
 
 class RBF_RandomFourierFeatures(TimeseriesFeatureExtractor):
     def __init__(
@@ -12,6 +13,7 @@ class RBF_RandomFourierFeatures(TimeseriesFeatureExtractor):
             n_features: int = 1000,
             seed: Optional[int] = None,
             method: Literal["cos(x)sin(x)", "cos(x + b)"] = "cos(x)sin(x)",
+            projection: Literal["gaussian", "orthogonal", "sorf"] = "gaussian",
             max_batch: int = 10000,
         ):
         """
@@ -28,12 +30,19 @@ class RBF_RandomFourierFeatures(TimeseriesFeatureExtractor):
             seed (int, optional): Seed for random matrix initialization.
             method (Literal["cos(x)sin(x)", "cos(x + b)"], optional): Method for 
                 generating the RFF map. Defaults to "cos(x)sin(x)".
+            projection (Literal["gaussian", "orthogonal", "sorf"], optional):
+                Distribution of the weights. "orthogonal" uses orthogonal
+                random features, and "sorf" uses structured orthogonal random
+                features H D_1 H D_2 H D_3 with fast Walsh-Hadamard transforms,
+                which cost O(n_features log d_pad) instead of O(n_features d),
+                where the input is zero padded to d_pad >= 64 dimensions.
         """
         super().__init__(max_batch)
         self.n_features = n_features
         self.seed = seed
         self.sigma = sigma
         self.method = method
+        self.projection = projection
         self.has_initialized = False
     
 
@@ -43,7 +52,8 @@ class RBF_RandomFourierFeatures(TimeseriesFeatureExtractor):
         ):
         """
         Initializes the random weights and biases for the RFF map. 
-        The weights are drawn from a N(0, 1/sigma^2) distribution.
+        The weights are marginally N(0, 1/sigma^2) distributed, see
+        'self.projection'.
 
         Args:
             X (Tensor): Input tensor of shape (N, d)
@@ -57,12 +67,13 @@ class RBF_RandomFourierFeatures(TimeseriesFeatureExtractor):
             gen.manual_seed(self.seed)
         else:
             gen.seed()
-        self.weights = torch.randn(d,
-                                   self.n_features, 
-                                   generator=gen,
-                                   device=device,
-                                   dtype=dtype
-                                   ) / self.sigma
+        self.weights = draw_projection(self.projection,
+                                       d,
+                                       self.n_features,
+                                       scale=1/self.sigma,
+                                       gen=gen,
+                                       device=device,
+                                       dtype=dtype)
         if self.method == "cos(x + b)":
             self.biases = 2 * np.pi * torch.rand(self.n_features, 
                                                 device=device, 
@@ -87,7 +98,7 @@ class RBF_RandomFourierFeatures(TimeseriesFeatureExtractor):
         # weights: (d, D)
         # biases: (D,)
         # X @ weights: (..., D)
-        matmul = X @ self.weights
+        matmul = apply_projection(X, self.weights, self.projection, self.n_features)
         if self.method == "cos(x + b)":
             return torch.cos(matmul + self.biases) / np.sqrt(self.n_features/2)
         else:
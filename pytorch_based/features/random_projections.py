@@ -0,0 +1,158 @@
+from typing import List, Dict, Set, Any, Optional, Tuple, Literal, Callable
+import torch
+from torch import Tensor
+import torch.nn.functional as F
+
+###################################################################  |
+############ Gaussian, orthogonal and structured projections ######  |
+################################################################### \|/
+
+# Minimum SORF block size. The entries of H D_1 H D_2 H D_3 are only close
+# to Gaussian for large blocks, hence small inputs are zero padded up to it.
+SORF_MIN_BLOCK = 64
+
+@torch.jit.script
+def fwht(
+        X: Tensor,
+    ):
+    """
+    Orthonormal fast Walsh-Hadamard transform H X / sqrt(n) along the
+    last dimension, in O(n log n).
+
+    Args:
+        X (Tensor): Tensor of shape (..., n), where n is a power of 2.
+
+    Returns:
+        Tensor: Tensor of shape (..., n).
+    """
+    n = X.shape[-1]
+    batch_shape = X.shape[:-1]
+    h = 1
+    while h < n:
+        Y = X.reshape(batch_shape + (n // (2*h), 2, h))
+        a, b = Y[..., 0, :], Y[..., 1, :]
+        X = torch.stack([a + b, a - b], dim=-2).reshape(batch_shape + (n,))
+        h *= 2
+    return X / n**0.5
+
+
+
+@torch.jit.script
+def sorf_project(
+        X: Tensor,
+        params: Tensor,
+        D: int,
+    ):
+    """
+    Structured orthogonal random projection W^T x, where each block of
+    W^T is sqrt(d_pad)/sigma * H D_1 H D_2 H D_3 for orthonormal Hadamard
+    matrices H and random sign diagonals D_i, see
+    https://arxiv.org/pdf/1610.09072.pdf. The scale is stored in D_1.
+
+    Args:
+        X (Tensor): Tensor of shape (..., d), where the batch dimensions
+            broadcast with params.shape[:-3].
+        params (Tensor): Tensor of shape (..., n_blocks, 3, d_pad) of the
+            scaled sign diagonals, where d_pad >= d is a power of 2.
+        D (int): Output dimension, at most n_blocks * d_pad.
+
+    Returns:
+        Tensor: Tensor of shape (..., D).
+    """
+    d_pad = params.shape[-1]
+    Y = F.pad(X, (0, d_pad - X.shape[-1]))[..., None, :] #shape (..., 1, d_pad)
+    for i in range(3):
+        Y = fwht(Y * params[..., i, :]) #shape (..., n_blocks, d_pad)
+    return Y.flatten(-2)[..., :D]
+
+
+
+def draw_projection(
+        projection: Literal["gaussian", "orthogonal", "sorf"],
+        d: int,
+        D: int,
+        batch_shape: Tuple[int, ...] = (),
+        scale: float = 1.0,
+        gen: Optional[torch.Generator] = None,
+        device: Optional[torch.device] = None,
+        dtype: Optional[torch.dtype] = None,
+    ) -> Tensor:
+    """
+    Draws random projections from R^d to R^D whose columns are marginally
+    N(0, scale^2 I) distributed. "gaussian" draws i.i.d. entries,
+    "orthogonal" draws blocks of d orthogonal columns with chi distributed
+    norms (orthogonal random features, https://arxiv.org/pdf/1610.09072.pdf),
+    and "sorf" draws the sign diagonals of structured orthogonal random
+    features, applied in O(D log d) with 'apply_projection'. The entries
+    of SORF are only approximately Gaussian, which biases kernel estimates
+    for small blocks, hence the input is zero padded to a block size of at
+    least SORF_MIN_BLOCK.
+
+    Args:
+        projection (Literal["gaussian", "orthogonal", "sorf"]): Type of
+            random projection.
+        d (int): Input dimension.
+        D (int): Output dimension.
+        batch_shape (Tuple[int, ...]): Shape of independent projections.
+        scale (float): Standard deviation of the entries.
+        gen (Optional[torch.Generator]): Random number generator.
+        device (Optional[torch.device]): Device of the parameters.
+        dtype (Optional[torch.dtype]): Dtype of the parameters.
+
+    Returns:
+        Tensor: Projection matrices of shape (*batch_shape, d, D), or for
+            "sorf" the parameters of shape (*batch_shape, n_blocks, 3, d_pad).
+    """
+    batch_shape = tuple(batch_shape)
+    if projection == "gaussian":
+        return scale * torch.randn(batch_shape + (d, D), generator=gen,
+                                   device=device, dtype=dtype)
+
+    elif projection == "orthogonal":
+        n_blocks = -(-D // d)
+        G = torch.randn(batch_shape + (n_blocks, d, d), generator=gen,
+                        device=device, dtype=dtype)
+        Q, R = torch.linalg.qr(G)
+        Q = Q * torch.sign(torch.diagonal(R, dim1=-2, dim2=-1))[..., None, :]
+        norms = torch.randn(batch_shape + (n_blocks, d, d), generator=gen,
+                            device=device, dtype=dtype).norm(dim=-2)
+        W = Q * norms[..., None, :] #columns of each block are orthogonal
+        W = W.movedim(-3, -2).reshape(batch_shape + (d, n_blocks*d))
+        return scale * W[..., :D]
+
+    elif projection == "sorf":
+        d_pad = max(1 << (d-1).bit_length(), SORF_MIN_BLOCK)
+        n_blocks = -(-D // d_pad)
+        dtype = dtype if dtype is not None else torch.get_default_dtype()
+        signs = 2*torch.randint(2, batch_shape + (n_blocks, 3, d_pad), generator=gen,
+                                device=device, dtype=dtype) - 1
+        signs[..., 0, :] *= d_pad**0.5 * scale
+        return signs
+
+    else:
+        raise ValueError(f"Unknown projection '{projection}'.")
+
+
+
+def apply_projection(
+        X: Tensor,
+        weights: Tensor,
+        projection: Literal["gaussian", "orthogonal", "sorf"],
+        D: int,
+    ) -> Tensor:
+    """
+    Applies a projection drawn with 'draw_projection'.
+
+    Args:
+        X (Tensor): Tensor of shape (..., d).
+        weights (Tensor): Projection of shape (d, D), or SORF parameters.
+        projection (Literal["gaussian", "orthogonal", "sorf"]): Type of
+            random projection.
+        D (int): Output dimension.
+
+    Returns:
+        Tensor: Tensor of shape (..., D).
+    """
+    if projection == "sorf":
+        return sorf_project(X, weights, D)
+    return X @ weights
@@ -4,6 +4,7 @@ from torch import Tensor
 from kernels.sig_trunc import cumsum_shift1
 
 from base import TimeseriesFeatureExtractor
+from random_projections import draw_projection, apply_projection
 
 ###################################################################  |
 ################# For the RBF-lifted signature ####################  |
@@ -35,12 +36,104 @@ def calc_P_RFF(
 
 
 
+@torch.jit.script
+def calc_P_RFF_buffered(
+        X: Tensor,
+        rff_weights_m: Tensor,
+        P_m: Tensor,
+        matmul: Tensor,
+        trig: Tensor,
+        out: Tensor,
+    ):
+    """
+    Same as 'calc_P_RFF' before the time differencing, but writes into 
+    preallocated buffers, such that the RFF map of all truncation levels 
+    can reuse the same memory. The concatenation [cos, sin] @ P_m is split
+    into cos @ P_m[:D] + sin @ P_m[D:], and since the projection is linear,
+    the time differences can be taken after projecting to D dimensions.
+
+    Args:
+        X (Tensor): Tensor of shape (M, d) of flattened time series.
+        rff_weights_m (Tensor): Tensor of shape (d, D) of RFF weights.
+        P_m (Tensor): Shape (2D, D) with i.i.d. standard Gaussians.
+        matmul (Tensor): Buffer of shape (M, D).
+        trig (Tensor): Buffer of shape (M, D).
+        out (Tensor): Buffer of shape (M, D) for the output.
+
+    Returns:
+        Tensor: The buffer 'out' of shape (M, D) of projected RFF features,
+            without the 1/sqrt(D) scaling.
+    """
+    D = rff_weights_m.shape[-1]
+    torch.mm(X, rff_weights_m, out=matmul)
+    torch.cos(matmul, out=trig)
+    torch.mm(trig, P_m[:D], out=out)
+    torch.sin(matmul, out=trig)
+    out.addmm_(trig, P_m[D:])
+    return out
+
+
+
+@torch.jit.script
+def sum_or_prefix_sum(
+        V: Tensor,
+        prefix: bool,
+    ):
+    """
+    Sums V over time, or if prefix=True, computes the sums over all 
+    prefixes in time, starting with the empty sum.
+
+    Args:
+        V (Tensor): Tensor of shape (..., T-1, D).
+        prefix (bool): Whether to return all prefix sums.
+
+    Returns:
+        Tensor: Tensor of shape (..., D), or (..., T, D) if prefix=True.
+    """
+    if not prefix:
+        return V.sum(dim=-2)
+    out = torch.zeros(V.shape[:-2] + (V.shape[-2]+1, V.shape[-1]),
+                      device=V.device, dtype=V.dtype)
+    torch.cumsum(V, dim=-2, out=out[..., 1:, :])
+    return out
+
+
+
+@torch.jit.script
+def trp_recursion(
+        U: Tensor,
+        prefix: bool = False,
+    ):
+    """
+    The TRP-RFSF recursion V_1 = U_1, V_m = cumsum_shift1(V_{m-1}) * U_m
+    over the projected increments of every truncation level.
+
+    Args:
+        U (Tensor): Tensor of shape (trunc_level, ..., T-1, D) with the
+            first level already scaled by 1/sqrt(D).
+        prefix (bool): If True, returns the features of every prefix 
+            X[..., :t+1, :] via cumulative sums over time.
+
+    Returns:
+        Tensor: Tensor of shape (trunc_level, ..., D), or 
+            (trunc_level, ..., T, D) if prefix=True.
+    """
+    V = U[0] #shape (..., T-1, D)
+    levels = [sum_or_prefix_sum(V, prefix)] #sum has shape (..., D)
+    for m in range(1, U.shape[0]):
+        V = cumsum_shift1(V, dim=-2) * U[m] #shape (..., T-1, D)
+        levels.append(sum_or_prefix_sum(V, prefix)) # sum has shape (..., D)
+    return torch.stack(levels, dim=0) #shape (trunc_level, ..., D)
+
+
+
 @torch.jit.script
 def tensorised_random_projection_features(
         X: Tensor,
         trunc_level: int,
         rff_weights: Tensor,
         P: Tensor,
+        prefix: bool = False,
     ):
     """
     Calculates the TRP-RFSF features for the given input tensor,
@@ -54,22 +147,33 @@ def tensorised_random_projection_features(
             independent RFF weights for each truncation level.
         P (Tensor): Shape (trunc_level, 2D, D) with i.i.d. standard 
             Gaussians.
+        prefix (bool): If True, returns the features of every prefix 
+            X[..., :t+1, :] via cumulative sums over time.
 
     Returns:
         Tensor: Tensor of shape (trunc_level, ..., D) of TRP-RFSF features
-            for each truncation level.
+            for each truncation level, or (trunc_level, ..., T, D) if 
+            prefix=True.
     """
-    #first level
+    #one level at a time, reusing the (..., T, D) RFF buffers
     D = P.shape[-1]
-    V = calc_P_RFF(X, rff_weights[0], P[0], D) / D**0.5  #shape (..., T-1, D)
-    levels = [V.sum(dim=-2)] #sum has shape (..., D)
-
-    #subsequent levels
-    for m in range(1, trunc_level):
-        U = calc_P_RFF(X, rff_weights[m], P[m], D) #shape (..., T-1, D)
-        V = cumsum_shift1(V, dim=-2) * U #shape (..., T-1, D)
-        levels.append(V.sum(dim=-2)) # sum has shape (..., D)
-    
+    batch_shape = X.shape[:-2]
+    T = X.shape[-2]
+    X = X.reshape(-1, X.shape[-1])
+    matmul = torch.empty(X.shape[0], D, device=X.device, dtype=X.dtype)
+    trig = torch.empty_like(matmul)
+    proj = torch.empty_like(matmul)
+
+    V = torch.empty(0)
+    levels: List[Tensor] = []
+    for m in range(trunc_level):
+        calc_P_RFF_buffered(X, rff_weights[m], P[m], matmul, trig, proj)
+        U = proj.reshape(batch_shape + (T, D)).diff(dim=-2) #shape (..., T-1, D)
+        if m == 0:
+            V = U.div_(D)
+        else:
+            V = U.mul_(cumsum_shift1(V, dim=-2)).div_(D**0.5)
+        levels.append(sum_or_prefix_sum(V, prefix))
     return torch.stack(levels, dim=0) #shape (trunc_level, ..., D)
 
 
@@ -78,6 +182,7 @@ def linear_tensorised_random_projection_features(
         X: Tensor,
         trunc_level: int,
         P: Tensor,
+        prefix: bool = False,
     ):
     """
     Calculates the TRP-RFSF features for the given input tensor,
@@ -91,26 +196,55 @@ def linear_tensorised_random_projection_features(
         trunc_level (int): Truncation level of the signature transform.
         P (Tensor): Shape (trunc_level, d, D) with i.i.d. standard 
             Gaussians.
+        prefix (bool): If True, returns the features of every prefix 
+            X[..., :t+1, :] via cumulative sums over time.
 
     Returns:
         Tensor: Tensor of shape (trunc_level, ..., D) of TRP-RFSF features
-            for each truncation level.
+            for each truncation level, or (trunc_level, ..., T, D) if 
+            prefix=True.
     """
     #first level
     D = P.shape[-1]
     V = X.diff(dim=-2) @ P[0] / D**0.5  #shape (..., T-1, D)
-    levels = [V.sum(dim=-2)] #sum has shape (..., D)
+    levels = [sum_or_prefix_sum(V, prefix)] #sum has shape (..., D)
 
     #subsequent levels
     for m in range(1, trunc_level):
         U = X.diff(dim=-2) @ P[m] #shape (..., T-1, D)
         V = cumsum_shift1(V, dim=-2) * U #shape (..., T-1, D)
-        levels.append(V.sum(dim=-2)) # sum has shape (..., D)
+        levels.append(sum_or_prefix_sum(V, prefix)) # sum has shape (..., D)
     
     return torch.stack(levels, dim=0) #shape (trunc_level, ..., D)
 
 
 
+@torch.jit.script
+def trp_streaming_update(
+        levels: Tensor,
+        U: Tensor,
+    ):
+    """
+    Advances the running TRP-RFSF level sums by new increments, using
+    V_1[t] = U_1[t] and V_m[t] = S_{m-1}[t] * U_m[t], where S_m[t] is
+    the sum of V_m over all previous steps. O(trunc_level * D) per step.
+
+    Args:
+        levels (Tensor): Running sums S_m of shape (trunc_level, ..., D).
+        U (Tensor): Projected increments of shape (trunc_level, ..., k, D),
+            with the first level already scaled by 1/sqrt(D).
+
+    Returns:
+        Tensor: Updated running sums of shape (trunc_level, ..., D).
+    """
+    for t in range(U.shape[-2]):
+        U_t = U[..., t, :]
+        V = torch.cat([U_t[0:1], levels[:-1] * U_t[1:]], dim=0)
+        levels = levels + V
+    return levels
+
+
+
 class SigTensorisedRandProj(TimeseriesFeatureExtractor):
     def __init__(
             self,
@@ -119,6 +253,8 @@ class SigTensorisedRandProj(TimeseriesFeatureExtractor):
             only_last: bool = False,
             method: Literal["linear", "RBF"] = "RBF",
             sigma_rbf: float = 1.0,
+            prefix: bool = False,
+            projection: Literal["gaussian", "orthogonal", "sorf"] = "gaussian",
             max_batch: int = 512,
         ):
         super().__init__(max_batch)
@@ -127,11 +263,16 @@ class SigTensorisedRandProj(TimeseriesFeatureExtractor):
         self.only_last = only_last
         self.method = method
         self.sigma_rbf = sigma_rbf
+        self.prefix = prefix
+        self.projection = projection
 
 
     def fit(self, X: Tensor):
         """
-        Initializes the random weights for the TRP-RFSF map. 
+        Initializes the random weights for the TRP-RFSF map. The RFF
+        weights and tensorised projections are i.i.d. Gaussian, orthogonal
+        or structured (SORF) depending on 'self.projection', see
+        'random_projections.draw_projection'.
 
         Args:
             X (Tensor): Example input tensor of shape (N, T, d) of 
@@ -144,21 +285,22 @@ class SigTensorisedRandProj(TimeseriesFeatureExtractor):
 
         #initialize the tensorized projection matrix for each truncation level
         in_dim = 2*self.n_features if self.method == "RBF" else d
-        self.P = torch.randn(self.trunc_level,
-                             in_dim, 
-                             self.n_features,
-                             device=device,
-                             dtype=dtype,)
+        self.P = draw_projection(self.projection,
+                                 in_dim,
+                                 self.n_features,
+                                 (self.trunc_level,),
+                                 device=device,
+                                 dtype=dtype)
         
         #initialize the RFF weights for each truncation level
         if self.method == "RBF":
-            self.rff_weights = torch.randn(
-                        self.trunc_level,
-                        d,
-                        self.n_features, 
-                        device=device,
-                        dtype=dtype
-                        ) / self.sigma_rbf
+            self.rff_weights = draw_projection(self.projection,
+                                               d,
+                                               self.n_features,
+                                               (self.trunc_level,),
+                                               scale=1/self.sigma_rbf,
+                                               device=device,
+                                               dtype=dtype)
         
             
 
@@ -168,7 +310,9 @@ class SigTensorisedRandProj(TimeseriesFeatureExtractor):
         ):
         """
         Computes the TRP-RFSF features for the given input tensor,
-        mapping time series from (N,T,d) to (N,n_features)
+        mapping time series from (N,T,d) to (N,n_features). If 
+        self.prefix=True, the features of every prefix X[:, :t+1] are 
+        computed in the same pass, for sequence labelling.
 
         Args:
             X (Tensor): Tensor of shape (N, T, d).
@@ -176,24 +320,148 @@ class SigTensorisedRandProj(TimeseriesFeatureExtractor):
         Returns:
             Tensor: Tensor of shape (trunc_level, N, n_features) or
                 (N, (trunc_level-1)*n_features) if self.only_last=True.
+                If self.prefix=True, an extra time dimension of size T
+                is inserted after N.
         """
 
-        if self.method == "RBF":
+        if self.projection == "sorf":
+            features = trp_recursion(self._level_increments(X), self.prefix)
+        elif self.method == "RBF":
             features = tensorised_random_projection_features(
-                X, self.trunc_level, self.rff_weights, self.P
+                X, self.trunc_level, self.rff_weights, self.P, self.prefix
                 )
         else:
             features = linear_tensorised_random_projection_features(
-                X, self.trunc_level, self.P
+                X, self.trunc_level, self.P, self.prefix
                 )
 
+        return self._format_features(features)
+
+
+    def _format_features(
+            self,
+            features: Tensor,
+        ):
+        """Formats features of shape (trunc_level, N, ..., D) as
+        the output of '_batched_transform'."""
         if self.only_last:
             return features[-1]
+        elif self.prefix:
+            trunc_level, N, T, D = features.shape
+            return features[1:].permute(1,2,3,0).reshape(N, T, -1)
         else:
             trunc_level, N, D = features.shape
             return features[1:].permute(1,2,0).reshape(N, -1)
 
 
+    def _level_increments(
+            self,
+            X: Tensor,
+        ):
+        """
+        Projected increments U_m of each truncation level, with the first
+        level scaled by 1/sqrt(D) as in the batch TRP-RFSF recursion.
+
+        Args:
+            X (Tensor): Tensor of shape (N, k+1, d).
+
+        Returns:
+            Tensor: Tensor of shape (trunc_level, N, k, n_features).
+        """
+        D = self.n_features
+        if self.projection == "sorf":
+            # per level projections broadcast over dim -2 of the input
+            if self.method == "RBF":
+                matmul = apply_projection(X[..., None, :], self.rff_weights, "sorf", D)
+                rff = torch.cat([torch.cos(matmul), 
+                                 torch.sin(matmul)], 
+                                 dim=-1) / D**0.5 #shape (N, k+1, trunc_level, 2D)
+                U = apply_projection(rff.diff(dim=1), self.P, "sorf", D)
+            else:
+                U = apply_projection(X.diff(dim=-2)[..., None, :], self.P, "sorf", D)
+            U = U.movedim(-2, 0)
+        elif self.method == "RBF":
+            U = torch.stack([calc_P_RFF(X, self.rff_weights[m], self.P[m], D)
+                             for m in range(self.trunc_level)])
+        else:
+            U = X.diff(dim=-2) @ self.P[:, None]
+        U[0] = U[0] / D**0.5
+        return U
+
+
+    def init_state(
+            self,
+            X: Tensor,
+        ) -> Dict[str, Tensor]:
+        """
+        Initializes the state of the streaming TRP-RFSF features, which
+        consists of the last observed point and the running sums of every
+        truncation level. The state is a dict of tensors, and can be 
+        checkpointed with torch.save together with the fitted extractor.
+
+        Args:
+            X (Tensor): First observations of shape (N, d), or history of
+                shape (N, T, d).
+
+        Returns:
+            Dict[str, Tensor]: State with keys "last" of shape (N, d) and
+                "levels" of shape (trunc_level, N, n_features).
+        """
+        if X.ndim == 2:
+            X = X.unsqueeze(1)
+        N = X.shape[0]
+        levels = torch.zeros(self.trunc_level, N, self.n_features,
+                             device=X.device, dtype=X.dtype)
+        if X.shape[1] > 1:
+            levels = trp_streaming_update(levels, self._level_increments(X))
+        return {"last": X[:, -1].clone(), "levels": levels}
+
+
+    def update(
+            self,
+            state: Dict[str, Tensor],
+            new_points: Tensor,
+        ) -> Dict[str, Tensor]:
+        """
+        Appends new observations to the streams in O(trunc_level * n_features)
+        per step for the level recursion, plus the projection of the new 
+        increments, instead of recomputing the features over the full history.
+
+        Args:
+            state (Dict[str, Tensor]): State from 'init_state' or 'update'.
+            new_points (Tensor): New observations of shape (N, d) or (N, k, d).
+
+        Returns:
+            Dict[str, Tensor]: The updated state.
+        """
+        if new_points.ndim == 2:
+            new_points = new_points.unsqueeze(1)
+        path = torch.cat([state["last"][:, None], new_points], dim=1)
+        levels = trp_streaming_update(state["levels"], self._level_increments(path))
+        return {"last": new_points[:, -1].clone(), "levels": levels}
+
+
+    def state_features(
+            self,
+            state: Dict[str, Tensor],
+        ):
+        """
+        Returns the features of the streams up to the current time, in 
+        the same format as 'transform' with prefix=False.
+
+        Args:
+            state (Dict[str, Tensor]): State from 'init_state' or 'update'.
+
+        Returns:
+            Tensor: Tensor of shape (N, (trunc_level-1)*n_features), or
+                (N, n_features) if self.only_last=True.
+        """
+        levels = state["levels"]
+        if self.only_last:
+            return levels[-1]
+        return levels[1:].permute(1,2,0).reshape(levels.shape[1], -1)
+
+
 # class TRP_RFSF_Gaussian():
 #     def __init__(
 #             self,
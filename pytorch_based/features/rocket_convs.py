@@ -0,0 +1,178 @@
+from typing import List, Dict, Set, Any, Optional, Tuple, Literal, Callable
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch import Tensor
+
+###################################################################  |
+########### Convolution helpers shared by ROCKET variants #########  |
+################################################################### \|/
+
+# Default max number of kernels, summed over all dilations, evaluated at 
+# a time by 'dilated_conv_chunks'.
+DEFAULT_KERNEL_CHUNK = 256
+
+def sampled_conv_quantiles(
+        conv: nn.Conv1d,
+        X: Tensor,
+        quantiles: Tensor,
+        chunk_size: int = 1000,
+        n_samples: int = 2000,
+        kernel_chunk: Optional[int] = None,
+    ) -> Tensor:
+    """Approximate quantiles of the outputs of each kernel of a convolution,
+    pooled over all samples and timesteps. The outputs are computed chunk by
+    chunk over the data and over groups of kernels, and a uniform sample of 
+    about 'n_samples' positions is kept per kernel. The quantiles are then 
+    read off the sorted samples of each kernel with linear interpolation, 
+    as in torch.quantile. Time is linear in N*T*n_kernels, and memory is 
+    O(n_kernels * n_samples) plus the outputs of one chunk.
+
+    Args:
+        conv (nn.Conv1d): Convolution with out_channels = n_kernels.
+        X (Tensor): Shape (N, D, T).
+        quantiles (Tensor): Quantile in [0, 1] of each kernel, shape (n_kernels,).
+        chunk_size (int): Batch size for computations.
+        n_samples (int): Approximate number of sampled positions per kernel.
+        kernel_chunk (Optional[int]): Max number of kernels per convolution.
+
+    Returns:
+        Tensor: Quantiles of shape (n_kernels,).
+    """
+    N, D, T = X.shape
+    n_kernels = conv.out_channels
+    kernel_chunk = kernel_chunk or n_kernels
+    keep = min(1.0, n_samples / (N*T))
+    samples = []
+    for x in torch.split(X, chunk_size):
+        x = x.to(conv.weight.dtype)
+        n_pos = x.shape[0] * T
+        idx = torch.randperm(n_pos, device=X.device)[:max(1, round(keep * n_pos))]
+        chunk_samples = []
+        for c0 in range(0, n_kernels, kernel_chunk):
+            c1 = min(c0 + kernel_chunk, n_kernels)
+            out = conv._conv_forward(x, conv.weight[c0:c1], None) #shape (n, k, T)
+            chunk_samples.append(out.permute(1,0,2).reshape(c1-c0, -1)[:, idx])
+        samples.append(torch.cat(chunk_samples, dim=0))
+    samples = torch.cat(samples, dim=1).sort(dim=1).values #shape (n_kernels, S)
+
+    # linear interpolation between order statistics
+    pos = quantiles.to(samples.dtype) * (samples.shape[1] - 1)
+    lo = pos.floor().long()
+    hi = pos.ceil().long()
+    q_lo = samples.gather(1, lo[:, None])[:, 0]
+    q_hi = samples.gather(1, hi[:, None])[:, 0]
+    return q_lo + (pos - lo) * (q_hi - q_lo)
+
+
+
+def dilated_input_columns(
+        x: Tensor,
+        dilations: List[int],
+        kernel_length: int,
+    ) -> Tensor:
+    """im2col of the input for "same" padded convolutions with several
+    dilations. The input is padded once for the largest dilation, and the
+    dilated windows of every dilation are strided views into it.
+
+    Args:
+        x (Tensor): Shape (N, D, T).
+        dilations (List[int]): Dilations of the convolutions.
+        kernel_length (int): Length of the convolution kernels.
+
+    Returns:
+        Tensor: Shape (n_dilations, N*T, D*kernel_length).
+    """
+    N, D, T = x.shape
+    max_pad = max(dilations) * (kernel_length-1) // 2
+    x_pad = F.pad(x, (max_pad, max_pad))
+    cols = []
+    for dilation in dilations:
+        span = dilation * (kernel_length-1)
+        start = max_pad - span // 2
+        windows = x_pad[..., start:start+T+span].unfold(-1, span+1, 1)[..., ::dilation] #shape (N, D, T, L)
+        cols.append(windows.permute(0, 2, 1, 3).reshape(N*T, D*kernel_length))
+    return torch.stack(cols, dim=0)
+
+
+
+def dilated_kernels_fft(
+        weight: Tensor,
+        dilations: List[int],
+        n_fft: int,
+    ) -> Tensor:
+    """Real FFTs of the dilated kernels, placed circularly such that 
+    irfft(rfft(x) * conj(W)) is the "same" padded cross-correlation.
+
+    Args:
+        weight (Tensor): Shape (n_dilations, K, D, L).
+        dilations (List[int]): Dilations of the convolutions.
+        n_fft (int): FFT length, at least T + max(dilations)*(L-1).
+
+    Returns:
+        Tensor: Complex tensor of shape (n_dilations, K, D, n_fft//2+1).
+    """
+    n_dil, K, D, L = weight.shape
+    W = torch.zeros(n_dil, K, D, n_fft, device=weight.device, dtype=weight.dtype)
+    for i, dilation in enumerate(dilations):
+        left = dilation * (L-1) // 2
+        idx = (torch.arange(L, device=weight.device) * dilation - left) % n_fft
+        W[i, :, :, idx] = weight[i]
+    return torch.fft.rfft(W, dim=-1)
+
+
+
+def dilated_conv_chunks(
+        convs: List[nn.Conv1d],
+        x: Tensor,
+        mode: Literal["unfold", "fft"],
+        kernel_chunk: Optional[int] = None,
+    ):
+    """Evaluates the "same" padded convolutions of all dilations at once,
+    either as one batched GEMM over the im2col of the input ("unfold"), or
+    as products in the Fourier domain ("fft"). For the kernel length 9 of
+    ROCKET, "fft" was slower than one Conv1d per dilation on CPU for every
+    T measured, up to T=32000, and "unfold" was on par with it. The input
+    transform is computed once and shared by all chunks of kernels, while
+    only the activations of about 'kernel_chunk' kernels over all
+    dilations are alive at a time. The im2col of "unfold" has shape
+    (n_dilations, N*T, D*L), independent of the number of kernels. Used
+    by both ROCKET and MultiRocket.
+
+    Args:
+        convs (List[nn.Conv1d]): Convolutions with one dilation each and 
+            the same number of kernels.
+        x (Tensor): Shape (N, D, T).
+        mode (Literal["unfold", "fft"]): How to evaluate the convolutions.
+        kernel_chunk (Optional[int]): Max number of kernels, summed over 
+            all dilations, in each chunk. Defaults to DEFAULT_KERNEL_CHUNK.
+            Each chunk holds the same kernels c0:c1 of every dilation.
+
+    Yields:
+        Tuple[int, int, Tensor]: Kernels c0:c1 of each dilation, and
+            their outputs of shape (N, n_dilations, c1-c0, T).
+    """
+    N, D, T = x.shape
+    dilations = [int(conv.dilation[0]) for conv in convs]
+    weight = torch.stack([conv.weight for conv in convs]) #shape (n_dil, K, D, L)
+    bias = torch.stack([conv.bias for conv in convs]) #shape (n_dil, K)
+    n_dil, K, D, L = weight.shape
+    if mode == "unfold":
+        cols = dilated_input_columns(x, dilations, L) #shape (n_dil, N*T, D*L)
+    else:
+        n_fft = 1 << (T + max(dilations)*(L-1) - 1).bit_length()
+        x_f = torch.fft.rfft(x, n=n_fft, dim=-1).permute(2, 0, 1) #shape (F, N, D)
+
+    chunk = max(1, (kernel_chunk or DEFAULT_KERNEL_CHUNK) // n_dil)
+    for c0 in range(0, K, chunk):
+        c1 = min(c0 + chunk, K)
+        k = c1 - c0
+        if mode == "unfold":
+            h = torch.bmm(cols, weight[:, c0:c1].reshape(n_dil, k, D*L).transpose(1, 2))
+            h = h.reshape(n_dil, N, T, k).permute(1, 0, 3, 2) #shape (N, n_dil, k, T)
+        else:
+            W_f = dilated_kernels_fft(weight[:, c0:c1], dilations, n_fft)
+            W_f = W_f.permute(3, 2, 0, 1).reshape(-1, D, n_dil*k).conj() #shape (F, D, n_dil*k)
+            h = torch.fft.irfft(torch.bmm(x_f, W_f).permute(1, 2, 0), n=n_fft, dim=-1)
+            h = h[..., :T].reshape(N, n_dil, k, T)
+        yield c0, c1, h + bias[None, :, c0:c1, None]
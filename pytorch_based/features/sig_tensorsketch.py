@@ -0,0 +1,183 @@
+from typing import List, Dict, Set, Any, Optional, Tuple, Literal, Callable
+import torch
+from torch import Tensor
+from kernels.sig_trunc import cumsum_shift1
+
+from base import TimeseriesFeatureExtractor
+from random_sig_fourier import sum_or_prefix_sum
+
+###################################################################  |
+############## TensorSketch of the truncated signature ############  |
+################################################################### \|/
+
+@torch.jit.script
+def count_sketch(
+        Z: Tensor,
+        hashes: Tensor,
+        signs: Tensor,
+        D: int,
+    ):
+    """
+    CountSketch of the last dimension of Z.
+
+    Args:
+        Z (Tensor): Tensor of shape (..., in_dim).
+        hashes (Tensor): Tensor of shape (in_dim,) with values in [0, D).
+        signs (Tensor): Tensor of shape (in_dim,) with values in {-1, 1}.
+        D (int): Sketch dimension.
+
+    Returns:
+        Tensor: Tensor of shape (..., D).
+    """
+    out = torch.zeros(Z.shape[:-1] + (D,), device=Z.device, dtype=Z.dtype)
+    out.index_add_(-1, hashes, Z * signs)
+    return out
+
+
+
+class SigTensorSketch(TimeseriesFeatureExtractor):
+    def __init__(
+            self,
+            trunc_level: int,
+            n_features: int,
+            only_last: bool = False,
+            method: Literal["linear", "RBF"] = "RBF",
+            sigma_rbf: float = 1.0,
+            prefix: bool = False,
+            max_batch: int = 512,
+        ):
+        """
+        Random features for the truncated signature kernel using
+        TensorSketch, as a drop-in alternative to SigTensorisedRandProj.
+        The dense Gaussian projections of each level are replaced by
+        CountSketches, stored as hash and sign tables, and the elementwise
+        products between levels are computed in the Fourier domain. This
+        costs O(in_dim + n_features log n_features) per timestep and level
+        instead of O(in_dim * n_features), where in_dim is d for the linear
+        kernel and 2*n_features for the RBF kernel.
+
+        Args:
+            trunc_level (int): Signature truncation level.
+            n_features (int): Sketch dimension, and the number of RFF
+                frequencies for method="RBF".
+            only_last (bool): If True, only returns the last level.
+            method (Literal["linear", "RBF"]): Static kernel lifted to
+                the signature kernel.
+            sigma_rbf (float): RBF bandwidth.
+            prefix (bool): If True, returns the features of every prefix
+                of the time series, see SigTensorisedRandProj.
+            max_batch (int): Maximum batch size for computations.
+        """
+        super().__init__(max_batch)
+        self.trunc_level = trunc_level
+        self.n_features = n_features
+        self.only_last = only_last
+        self.method = method
+        self.sigma_rbf = sigma_rbf
+        self.prefix = prefix
+
+
+    def fit(self, X: Tensor, y=None):
+        """
+        Initializes the CountSketch hashes and signs of each level, and
+        the RFF weights if method="RBF".
+
+        Args:
+            X (Tensor): Example input tensor of shape (N, T, d) of
+                timeseries.
+        """
+        # Get shape, dtype and device info.
+        d = X.shape[-1]
+        device = X.device
+        dtype = X.dtype
+
+        #initialize the hash tables for each truncation level
+        in_dim = 2*self.n_features if self.method == "RBF" else d
+        self.hashes = torch.randint(self.n_features,
+                                    (self.trunc_level, in_dim),
+                                    device=device)
+        self.signs = (2*torch.randint(2, (self.trunc_level, in_dim), device=device) - 1).to(dtype)
+
+        #initialize the RFF weights for each truncation level
+        if self.method == "RBF":
+            self.rff_weights = torch.randn(
+                        self.trunc_level,
+                        d,
+                        self.n_features,
+                        device=device,
+                        dtype=dtype
+                        ) / self.sigma_rbf
+        return self
+
+
+    def _sketched_increments(
+            self,
+            X: Tensor,
+            m: int,
+        ):
+        """
+        Fourier transformed CountSketch of the increments of the lifted
+        time series at truncation level m. The sketch is linear, hence the
+        time series is sketched before taking increments, and for the RBF
+        kernel the cos and sin features are sketched into the same buffer,
+        such that only (N, T, n_features) sized tensors are created.
+
+        Args:
+            X (Tensor): Tensor of shape (N, T, d).
+            m (int): Truncation level, starting from 0.
+
+        Returns:
+            Tensor: Complex tensor of shape (N, T-1, n_features//2+1).
+        """
+        D = self.n_features
+        hashes, signs = self.hashes[m], self.signs[m]
+        if self.method == "RBF":
+            matmul = X @ self.rff_weights[m] #shape (N, T, D)
+            S = count_sketch(torch.cos(matmul), hashes[:D], signs[:D], D)
+            S.index_add_(-1, hashes[D:], torch.sin(matmul).mul_(signs[D:]))
+            S.div_(D**0.5)
+        else:
+            S = count_sketch(X, hashes, signs, D)
+        return torch.fft.rfft(S.diff(dim=1), n=D, dim=-1)
+
+
+    def _batched_transform(
+            self,
+            X:Tensor,
+        ):
+        """
+        Computes the TensorSketch signature features for the given
+        input tensor, mapping time series from (N,T,d) to (N,n_features).
+        Uses the TRP-RFSF style recursion 
+        V_m[t] = cumsum_shift1(V_{m-1})[t] * U_m[t] in the Fourier domain,
+        where the elementwise product of the FFTs of independent 
+        CountSketches is the FFT of the TensorSketch of the tensor product,
+        see https://arxiv.org/pdf/2311.12214.pdf and
+        https://dl.acm.org/doi/10.1145/2487575.2487591. The levels are 
+        sketched one at a time, such that memory does not grow with 
+        trunc_level, as in 'tensorised_random_projection_features'.
+
+        Args:
+            X (Tensor): Tensor of shape (N, T, d).
+
+        Returns:
+            Tensor: Tensor of shape (N, (trunc_level-1)*n_features) or
+                (N, n_features) if self.only_last=True. If
+                self.prefix=True, an extra time dimension of size T is
+                inserted after N.
+        """
+        V = self._sketched_increments(X, 0) #shape (N, T-1, D//2+1)
+        levels = [sum_or_prefix_sum(V, self.prefix)]
+        for m in range(1, self.trunc_level):
+            V = cumsum_shift1(V, dim=-2) * self._sketched_increments(X, m)
+            levels.append(sum_or_prefix_sum(V, self.prefix))
+        features = torch.fft.irfft(torch.stack(levels, dim=0), n=self.n_features, dim=-1)
+
+        if self.only_last:
+            return features[-1]
+        elif self.prefix:
+            trunc_level, N, T, D = features.shape
+            return features[1:].permute(1,2,3,0).reshape(N, T, -1)
+        else:
+            trunc_level, N, D = features.shape
+            return features[1:].permute(1,2,0).reshape(N, -1)
@@ -1,30 +1,262 @@
 from typing import List, Dict, Set, Any, Optional, Tuple, Literal, Callable
+from functools import lru_cache
+from math import factorial
 import torch
+import torch.nn.functional as F
 from torch import Tensor
-import signatory
 from sklearn.base import TransformerMixin, BaseEstimator
 
 from base import TimeseriesFeatureExtractor
 
+try:
+    import signatory
+except ImportError:
+    signatory = None
+
+
+def resolve_backend(
+    backend: Optional[Literal["signatory", "native"]],
+):
+    """Returns 'backend' if not None, else "signatory" if
+    signatory is installed and "native" otherwise."""
+    if backend is None:
+        return "signatory" if signatory is not None else "native"
+    return backend
+
+
+####################################################################  |
+########## Native signatures in the tensor algebra #################  |
+#################################################################### \|/
+# Truncated signatures are stored flat without the scalar term, as in
+# signatory, i.e. as tensors of shape (..., d + d^2 + ... + d^trunc_level).
+
+
+def split_levels(
+    S: Tensor,
+    d: int,
+    trunc_level: int,
+) -> List[Tensor]:
+    """Splits flat truncated tensors into views of shape (..., d^k)
+    for each level k = 1, ..., trunc_level."""
+    levels = []
+    i = 0
+    for k in range(1, trunc_level+1):
+        levels.append(S[..., i:i+d**k])
+        i += d**k
+    return levels
+
+
+
+def level_product(
+    A: List[Tensor],
+    B: List[Tensor],
+    k: int,
+) -> Tensor:
+    """Level k of the tensor product of two truncated tensors with
+    zero scalar term, i.e. sum_{i=1}^{k-1} A_i (x) B_{k-i}."""
+    out = None
+    for i in range(1, k):
+        a, b = A[i-1], B[k-i-1]
+        term = (a[..., :, None] * b[..., None, :]).flatten(-2)
+        out = term if out is None else out + term
+    return out
+
+
+
+def native_sig_combine(
+    A: Tensor,
+    B: Tensor,
+    d: int,
+    trunc_level: int,
+) -> Tensor:
+    """Chen's identity. Computes the truncated tensor product of two
+    signatures (1 + A) (x) (1 + B), i.e. the signature of the
+    concatenation of the underlying paths.
+
+    Args:
+        A (Tensor): Signatures of shape (..., D).
+        B (Tensor): Signatures of shape (..., D).
+        d (int): Path dimension.
+        trunc_level (int): Signature truncation level.
+
+    Returns:
+        Tensor: Tensor of shape (..., D).
+    """
+    A_lv = split_levels(A, d, trunc_level)
+    B_lv = split_levels(B, d, trunc_level)
+    out = [A_lv[0] + B_lv[0]]
+    for k in range(2, trunc_level+1):
+        out.append(A_lv[k-1] + B_lv[k-1] + level_product(A_lv, B_lv, k))
+    return torch.cat(out, dim=-1)
+
+
+
+def native_segment_sig(
+    X: Tensor,
+    trunc_level: int,
+) -> Tensor:
+    """Signatures exp(dX_t) = sum_k dX_t^{(x)k} / k! of each linear
+    segment of a batch of time series.
+
+    Args:
+        X (Tensor): Tensor of shape (..., T, d) of time series.
+        trunc_level (int): Signature truncation level.
+
+    Returns:
+        Tensor: Tensor of shape (..., T-1, D).
+    """
+    dX = X.diff(dim=-2)
+    power = dX
+    levels = [dX]
+    for k in range(2, trunc_level+1):
+        power = (power[..., :, None] * dX[..., None, :]).flatten(-2)
+        levels.append(power / factorial(k))
+    return torch.cat(levels, dim=-1)
+
+
+
+def native_sig(
+    X: Tensor,
+    trunc_level: int,
+) -> Tensor:
+    """Truncated signature of a batch of time series, computed by
+    combining the segment signatures pairwise in a tree with Chen's
+    identity. This is a parallel reduction of depth O(log T), where each
+    level of the tree is a single batched tensor product.
+
+    Args:
+        X (Tensor): Tensor of shape (N, T, d) of time series.
+        trunc_level (int): Signature truncation level.
+
+    Returns:
+        Tensor: Tensor of shape (N, D).
+    """
+    d = X.shape[-1]
+    S = native_segment_sig(X, trunc_level) # shape (N, T-1, D)
+    while S.shape[1] > 1:
+        if S.shape[1] % 2 == 1:
+            S = F.pad(S, (0, 0, 0, 1)) # zeros are the identity
+        S = native_sig_combine(S[:, 0::2], S[:, 1::2], d, trunc_level)
+    return S[:, 0]
+
+
+
+def native_sig_to_logsig_tensor(
+    S: Tensor,
+    d: int,
+    trunc_level: int,
+) -> Tensor:
+    """Truncated tensor logarithm log(1 + S) = sum_n (-1)^(n+1) S^n / n.
+
+    Args:
+        S (Tensor): Signatures of shape (..., D).
+        d (int): Path dimension.
+        trunc_level (int): Signature truncation level.
+
+    Returns:
+        Tensor: Log-signatures in the tensor algebra of shape (..., D).
+    """
+    S_lv = split_levels(S, d, trunc_level)
+    power = S_lv
+    out = list(S_lv)
+    for n in range(2, trunc_level+1):
+        # S^n vanishes below level n
+        power = [torch.zeros_like(S_lv[k-1]) if k < n else level_product(power, S_lv, k)
+                 for k in range(1, trunc_level+1)]
+        for k in range(n, trunc_level+1):
+            out[k-1] = out[k-1] + (-1)**(n+1) / n * power[k-1]
+    return torch.cat(out, dim=-1)
+
+
+
+def lyndon_words(
+    d: int,
+    trunc_level: int,
+) -> List[Tuple[int, ...]]:
+    """Lyndon words of length at most 'trunc_level' over the alphabet
+    {0, ..., d-1}, ordered by length and then lexicographically,
+    generated with Duval's algorithm."""
+    words = []
+    w = [-1]
+    while w:
+        w[-1] += 1
+        words.append(tuple(w))
+        m = len(w)
+        while len(w) < trunc_level:
+            w.append(w[len(w) - m])
+        while w and w[-1] == d-1:
+            w.pop()
+    return sorted(words, key=lambda word: (len(word), word))
+
+
+
+@lru_cache(maxsize=None)
+def lyndon_indices(
+    d: int,
+    trunc_level: int,
+) -> Tensor:
+    """Cached indices of the Lyndon words in the flat tensor algebra,
+    which project log-signatures onto the Lyndon basis."""
+    offsets = [sum(d**j for j in range(1, k)) for k in range(1, trunc_level+2)]
+    indices = []
+    for word in lyndon_words(d, trunc_level):
+        idx = 0
+        for letter in word:
+            idx = idx*d + letter
+        indices.append(offsets[len(word)-1] + idx)
+    return torch.tensor(indices, dtype=torch.long)
+
+
+
+def native_sig_to_logsig(
+    S: Tensor,
+    d: int,
+    trunc_level: int,
+) -> Tensor:
+    """Log-signatures in the Lyndon basis, i.e. the coefficients of the
+    Lyndon words in the tensor logarithm, as in the "words" mode of
+    signatory.
+
+    Args:
+        S (Tensor): Signatures of shape (..., D).
+        d (int): Path dimension.
+        trunc_level (int): Signature truncation level.
+
+    Returns:
+        Tensor: Tensor of shape (..., n_lyndon_words).
+    """
+    log_tensor = native_sig_to_logsig_tensor(S, d, trunc_level)
+    return log_tensor[..., lyndon_indices(d, trunc_level).to(S.device)]
+
+
+####################################################################  |
+########## Signatures with signatory or native backend #############  |
+#################################################################### \|/
+
 
 def sig(
     X: Tensor,
     trunc_level: int,
+    backend: Optional[Literal["signatory", "native"]] = None,
 ):
     """Computes the truncated signature of time series of
     shape (T,d) with optional batch support.
-    
+
     Args:
-        X (Tensor): Tensor of shape (N, T, d) or (T, d) 
+        X (Tensor): Tensor of shape (N, T, d) or (T, d)
             of time series.
         trunc_level (int): Signature truncation level.
-    
+        backend (Optional[Literal["signatory", "native"]]): Defaults to
+            signatory if installed, else the native implementation.
+
     Returns:
-        Tensor: Tensor of shape (N, D) or (D) where 
+        Tensor: Tensor of shape (N, D) or (D) where
             D = 1 + d + d^2 + ... + d^trunc_level.
     """
     if len(X.shape) == 2:
         X = X.unsqueeze(0)
+    if resolve_backend(backend) == "native":
+        return native_sig(X, trunc_level)
     return signatory.signature(X, trunc_level)
 
 
@@ -32,39 +264,182 @@ def sig(
 def logsig(
     X: Tensor,
     trunc_level: int,
+    backend: Optional[Literal["signatory", "native"]] = None,
 ):
     """Computes the truncated log-signature of time series of
     shape (T,d) with optional batch support.
-    
+
     Args:
-        X (Tensor): Tensor of shape (N, T, d) or (T, d) 
+        X (Tensor): Tensor of shape (N, T, d) or (T, d)
             of time series.
         trunc_level (int): Signature truncation level.
-    
+        backend (Optional[Literal["signatory", "native"]]): Defaults to
+            signatory if installed, else the native implementation.
+
     Returns:
-        Tensor: Tensor of shape (N, D) or (D) where D is 
+        Tensor: Tensor of shape (N, D) or (D) where D is
             O(d^trunc_level) but smaller than the signature.
     """
     if len(X.shape) == 2:
         X = X.unsqueeze(0)
+    if resolve_backend(backend) == "native":
+        return native_sig_to_logsig(native_sig(X, trunc_level), X.shape[-1], trunc_level)
     return signatory.logsignature(X, trunc_level)
 
 
 
+def segment_sig(
+    X: Tensor,
+    trunc_level: int,
+    backend: Optional[Literal["signatory", "native"]] = None,
+):
+    """Computes the truncated signatures of each linear segment
+    [X_t, X_{t+1}] of a batch of time series.
+
+    Args:
+        X (Tensor): Tensor of shape (N, T, d) of time series.
+        trunc_level (int): Signature truncation level.
+        backend (Optional[Literal["signatory", "native"]]): Defaults to
+            signatory if installed, else the native implementation.
+
+    Returns:
+        Tensor: Tensor of shape (N, T-1, D) where
+            D = d + d^2 + ... + d^trunc_level.
+    """
+    if resolve_backend(backend) == "native":
+        return native_segment_sig(X, trunc_level)
+    N, T, d = X.shape
+    segments = torch.stack([X[:, :-1], X[:, 1:]], dim=2) # shape (N, T-1, 2, d)
+    sigs = signatory.signature(segments.reshape(N*(T-1), 2, d), trunc_level)
+    return sigs.reshape(N, T-1, -1)
+
+
+
+def sliding_sig(
+    X: Tensor,
+    trunc_level: int,
+    window: int,
+    stride: int = 1,
+    backend: Optional[Literal["signatory", "native"]] = None,
+):
+    """Computes the truncated signatures of all sliding windows
+    X[:, s:s+window] for s = 0, stride, 2*stride, ... of a batch of
+    time series. The segment signatures are combined via Chen's identity
+    using the two-stack queue in its blocked form (van Herk/Gil-Werman):
+    the segments are split into blocks of size window-1, within which
+    all prefix and suffix products are computed, and each window is the
+    product of a suffix of one block and a prefix of the next. This costs
+    3 tensor products per timestep regardless of the window size, and the
+    Python loops run over the window size only, batched over all blocks.
+
+    Args:
+        X (Tensor): Tensor of shape (N, T, d) or (T, d) of time series.
+        trunc_level (int): Signature truncation level.
+        window (int): Number of points in each window, at least 2.
+        stride (int): Step between the starting points of the windows.
+        backend (Optional[Literal["signatory", "native"]]): Defaults to
+            signatory if installed, else the native implementation.
+
+    Returns:
+        Tensor: Tensor of shape (N, n_windows, D) or (n_windows, D),
+            where n_windows = (T - window) // stride + 1 and
+            D = d + d^2 + ... + d^trunc_level.
+    """
+    squeeze = X.ndim == 2
+    if squeeze:
+        X = X.unsqueeze(0)
+    N, T, d = X.shape
+    w = window - 1 # number of segments per window
+    assert 1 <= w <= T-1, "window has to be between 2 and T."
+    backend = resolve_backend(backend)
+
+    def combine(A: Tensor, B: Tensor) -> Tensor:
+        if backend == "native":
+            return native_sig_combine(A, B, d, trunc_level)
+        out = signatory.signature_combine(A.reshape(-1, A.shape[-1]),
+                                          B.reshape(-1, B.shape[-1]),
+                                          d, trunc_level)
+        return out.reshape(A.shape)
+
+    # pad with zero increments, whose signature is the identity
+    seg = segment_sig(X, trunc_level, backend) # shape (N, M, D)
+    M, D = seg.shape[1:]
+    n_blocks = -(-M // w)
+    seg = F.pad(seg, (0, 0, 0, n_blocks*w - M)).reshape(N, n_blocks, w, D)
+
+    # prefix and suffix products within each block
+    prefix = seg.clone()
+    suffix = seg.clone()
+    for k in range(1, w):
+        prefix[:, :, k] = combine(prefix[:, :, k-1], seg[:, :, k])
+    for k in range(w-2, -1, -1):
+        suffix[:, :, k] = combine(seg[:, :, k], suffix[:, :, k+1])
+    prefix = prefix.reshape(N, n_blocks*w, D)
+    suffix = suffix.reshape(N, n_blocks*w, D)
+
+    # window [s, s+w) = suffix from s times prefix up to s+w-1 in the next block
+    starts = torch.arange(0, M-w+1, stride, device=X.device)
+    out = suffix[:, starts]
+    is_unaligned = starts % w != 0
+    if is_unaligned.any():
+        unaligned = starts[is_unaligned]
+        out[:, is_unaligned] = combine(suffix[:, unaligned], prefix[:, unaligned + w-1])
+    return out[0] if squeeze else out
+
+
+
+def sliding_logsig(
+    X: Tensor,
+    trunc_level: int,
+    window: int,
+    stride: int = 1,
+    backend: Optional[Literal["signatory", "native"]] = None,
+):
+    """Computes the truncated log-signatures of all sliding windows
+    X[:, s:s+window] for s = 0, stride, 2*stride, ... of a batch of
+    time series, see 'sliding_sig'.
+
+    Args:
+        X (Tensor): Tensor of shape (N, T, d) or (T, d) of time series.
+        trunc_level (int): Signature truncation level.
+        window (int): Number of points in each window, at least 2.
+        stride (int): Step between the starting points of the windows.
+        backend (Optional[Literal["signatory", "native"]]): Defaults to
+            signatory if installed, else the native implementation.
+
+    Returns:
+        Tensor: Tensor of shape (N, n_windows, D) or (n_windows, D),
+            where n_windows = (T - window) // stride + 1.
+    """
+    d = X.shape[-1]
+    backend = resolve_backend(backend)
+    sigs = sliding_sig(X, trunc_level, window, stride, backend)
+    if backend == "native":
+        return native_sig_to_logsig(sigs, d, trunc_level)
+    logsigs = signatory.signature_to_logsignature(sigs.reshape(-1, sigs.shape[-1]),
+                                                  d, trunc_level)
+    return logsigs.reshape(sigs.shape[:-1] + logsigs.shape[-1:])
+
+
+
 class SigTransform(TimeseriesFeatureExtractor):
     def __init__(
             self,
             trunc_level: int = 3,
+            backend: Optional[Literal["signatory", "native"]] = None,
             max_batch: int = 512,
         ):
         """Initializes the SigTransform object.
-        
+
         Args:
             trunc_level (int): Signature truncation level. Defaults to 3.
+            backend (Optional[Literal["signatory", "native"]]): Defaults to
+                signatory if installed, else the native implementation.
             max_batch (int): Maximum batch size for computations.
         """
         super().__init__(max_batch)
         self.trunc_level = trunc_level
+        self.backend = backend
 
 
     def fit(self, X: Tensor, y=None):
@@ -75,7 +450,7 @@ class SigTransform(TimeseriesFeatureExtractor):
             self,
             X:Tensor,
         ):
-        return sig(X, self.trunc_level)
+        return sig(X, self.trunc_level, self.backend)
 
 
 
@@ -83,16 +458,98 @@ class LogSigTransform(TimeseriesFeatureExtractor):
     def __init__(
             self,
             trunc_level: int = 3,
+            backend: Optional[Literal["signatory", "native"]] = None,
             max_batch: int = 512,
         ):
         """Initializes the LogSigTransform object.
-        
+
+        Args:
+            trunc_level (int): Signature truncation level. Defaults to 3.
+            backend (Optional[Literal["signatory", "native"]]): Defaults to
+                signatory if installed, else the native implementation.
+            max_batch (int): Maximum batch size for computations.
+        """
+        super().__init__(max_batch)
+        self.trunc_level = trunc_level
+        self.backend = backend
+
+
+    def fit(self, X: Tensor, y=None):
+        return self
+
+
+    def _batched_transform(
+            self,
+            X:Tensor,
+        ):
+        return logsig(X, self.trunc_level, self.backend)
+
+
+
+class SlidingSigTransform(TimeseriesFeatureExtractor):
+    def __init__(
+            self,
+            window: int,
+            stride: int = 1,
+            trunc_level: int = 3,
+            backend: Optional[Literal["signatory", "native"]] = None,
+            max_batch: int = 512,
+        ):
+        """Signatures of all sliding windows of the time series,
+        computed via Chen's identity, see 'sliding_sig'.
+
+        Args:
+            window (int): Number of points in each window.
+            stride (int): Step between the starting points of the windows.
+            trunc_level (int): Signature truncation level. Defaults to 3.
+            backend (Optional[Literal["signatory", "native"]]): Defaults to
+                signatory if installed, else the native implementation.
+            max_batch (int): Maximum batch size for computations.
+        """
+        super().__init__(max_batch)
+        self.window = window
+        self.stride = stride
+        self.trunc_level = trunc_level
+        self.backend = backend
+
+
+    def fit(self, X: Tensor, y=None):
+        return self
+
+
+    def _batched_transform(
+            self,
+            X:Tensor,
+        ):
+        return sliding_sig(X, self.trunc_level, self.window, self.stride, self.backend)
+
+
+
+class SlidingLogSigTransform(TimeseriesFeatureExtractor):
+    def __init__(
+            self,
+            window: int,
+            stride: int = 1,
+            trunc_level: int = 3,
+            backend: Optional[Literal["signatory", "native"]] = None,
+            max_batch: int = 512,
+        ):
+        """Log-signatures of all sliding windows of the time series,
+        computed via Chen's identity, see 'sliding_sig'.
+
         Args:
+            window (int): Number of points in each window.
+            stride (int): Step between the starting points of the windows.
             trunc_level (int): Signature truncation level. Defaults to 3.
+            backend (Optional[Literal["signatory", "native"]]): Defaults to
+                signatory if installed, else the native implementation.
             max_batch (int): Maximum batch size for computations.
         """
         super().__init__(max_batch)
+        self.window = window
+        self.stride = stride
         self.trunc_level = trunc_level
+        self.backend = backend
 
 
     def fit(self, X: Tensor, y=None):
@@ -103,4 +560,4 @@ class LogSigTransform(TimeseriesFeatureExtractor):
             self,
             X:Tensor,
         ):
-        return logsig(X, self.trunc_level)
+        return sliding_logsig(X, self.trunc_level, self.window, self.stride, self.backend)
\ No newline at end of file
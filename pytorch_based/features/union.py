@@ -0,0 +1,76 @@
+from typing import List, Dict, Set, Any, Optional, Tuple, Literal, Callable, Union
+import numpy as np
+import torch
+from torch import Tensor
+
+from base import TimeseriesFeatureExtractor, write_chunk
+
+
+class FusedFeatureUnion(TimeseriesFeatureExtractor):
+    def __init__(
+            self,
+            extractors: List[TimeseriesFeatureExtractor],
+            preprocessing: Optional[List[Callable[[Tensor], Tensor]]] = None,
+            max_batch: int = 512,
+        ):
+        """
+        Concatenates the features of several extractors in a single pass
+        over the data. Each chunk of 'max_batch' series is preprocessed once,
+        for instance by 'add_basepoint_zero' and 'augment_time', and then
+        transformed by every child extractor, whose features are written
+        into disjoint column slices of one preallocated output matrix.
+        The 'max_batch' of the children is not used.
+
+        Args:
+            extractors (List[TimeseriesFeatureExtractor]): Child extractors.
+            preprocessing (Optional[List[Callable[[Tensor], Tensor]]]):
+                Functions applied in order to each chunk of shape (N,T,D)
+                before it is passed to the children.
+            max_batch (int): Maximum chunk size for computations.
+        """
+        super().__init__(max_batch)
+        self.extractors = extractors
+        self.preprocessing = preprocessing
+
+
+    def _preprocess(self, X: Tensor) -> Tensor:
+        for fn in (self.preprocessing or []):
+            X = fn(X)
+        return X
+
+
+    def fit(self, X: Tensor, y=None):
+        """Fits every child extractor on the preprocessed data.
+
+        Args:
+            X (Tensor): Batched time series data of shape (N, T, D).
+        """
+        X = self._preprocess(X)
+        for extractor in self.extractors:
+            extractor.fit(X)
+        return self
+
+
+    def _batched_transform(self, X: Tensor) -> Tensor:
+        X = self._preprocess(X)
+        N = X.shape[0]
+        return torch.cat(
+            [extractor._batched_transform(X).reshape(N, -1)
+             for extractor in self.extractors],
+            dim=1
+            )
+
+
+    def _transform_into(
+            self,
+            X: Tensor,
+            out: Union[Tensor, np.ndarray],
+            i: int,
+        ):
+        X = self._preprocess(X)
+        N = X.shape[0]
+        col = 0
+        for extractor in self.extractors:
+            features = extractor._batched_transform(X).reshape(N, -1)
+            write_chunk(out[:, col:col+features.shape[1]], i, features)
+            col += features.shape[1]
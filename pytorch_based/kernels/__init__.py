@@ -5,4 +5,7 @@ from .integral import StaticIntegralKernel
 from .flattened_static import FlattenedStaticKernel
 from .gak import GlobalAlignmentKernel, sigma_gak
 from .reservoir import ReservoirKernel
-from .sig_random import RandomizedSigKernel
\ No newline at end of file
+from .sig_random import RandomizedSigKernel
+from .kernel_pca import KernelPCA
+from .svm import KernelSVC, KernelRowCache
+from .combined import CombinedKernel
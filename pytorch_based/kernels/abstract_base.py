@@ -1,4 +1,4 @@
-from typing import List, Dict, Set, Any, Optional, Tuple, Literal, Callable
+from typing import List, Dict, Set, Any, Optional, Tuple, Literal, Callable, Iterator
 import itertools
 from abc import ABC, abstractmethod
 
@@ -218,6 +218,53 @@ class TimeSeriesKernel(ABC):
         pass
 
 
+    def _features(
+            self,
+            X: Tensor,
+            max_batch: int,
+            n_jobs: int,
+        ) -> Optional[Tensor]:
+        """
+        Optional hook for kernels of the form k(x, y) = f(<phi(x), phi(y)>)
+        with an explicit feature map phi. Returns the features of shape 
+        (N, ...) consumed by '_feature_gram', or None if the kernel has no
+        feature map, which is the default. Allows callers that evaluate the
+        kernel tile by tile, such as 'CombinedKernel', to compute the 
+        features of each series once instead of once per tile.
+
+        Args:
+            X (Tensor): Tensor with shape (N, T, d).
+            max_batch (int): Max batch size for computations.
+            n_jobs (int): Number of parallel jobs to run in joblib.Parallel.
+
+        Returns:
+            Optional[Tensor]: Features of X, or None.
+        """
+        return None
+
+
+    def _feature_gram(
+            self,
+            feat_X: Tensor,
+            feat_Y: Tensor,
+            diag: bool,
+        ) -> Tensor:
+        """
+        Unnormalized Gram matrix, or its diagonal if diag=True, from the
+        features returned by '_features'. Only called if '_features' does 
+        not return None.
+
+        Args:
+            feat_X (Tensor): Features of X with shape (N1, ...).
+            feat_Y (Tensor): Features of Y with shape (N2, ...).
+            diag (bool): If True, only computes the diagonal k(X_i, Y_i).
+
+        Returns:
+            Tensor: Tensor with shape (N1, N2, ...) or (N1, ...) if diag=True.
+        """
+        raise NotImplementedError
+
+
     def _max_batched_gram(
             self,
             X: Tensor,
@@ -261,14 +308,14 @@ class TimeSeriesKernel(ABC):
             delayed(self._gram)(x, y, diag) for x,y in split
             )
 
-        # reshape back
+        # reshape back. Blocks are ordered (X chunk, Y chunk) by itertools.product
         if diag:
             result = torch.cat(result, dim=0)
-        elif max_batch >= N1:
-            result = torch.cat(result, dim=1)
         else:
-            extra = result[0].shape[2:]
-            result = torch.cat(result, dim=0).reshape( (N1, N2)+extra )
+            n_Y_chunks = len(split_Y)
+            rows = [torch.cat(result[i:i+n_Y_chunks], dim=1) 
+                    for i in range(0, len(result), n_Y_chunks)]
+            result = torch.cat(rows, dim=0)
     
         # normalize
         if normalize:
@@ -280,19 +327,98 @@ class TimeSeriesKernel(ABC):
             else:
                 XX = self._max_batched_gram(X, X, True, max_batch, False, n_jobs) #shape (N1, ...)
                 YY = self._max_batched_gram(Y, Y, True, max_batch, False, n_jobs) #shape (N2, ...)
-            if not diag:
-                XX = XX[:, None] #shape (N1, 1, ...)
-                YY = YY[None, :] #shape (1, N2, ...)
-
-            # Normalize with diagonals k(X,Y) = k(X,Y) / sqrt(k(X,X) * k(Y,Y))
-            if self.log_space:
-                result = result - 0.5*XX - 0.5*YY
-            else:
-                result = result / torch.sqrt(XX) / torch.sqrt(YY)
+            result = self._normalize_gram(result, XX, YY, diag)
 
         return result
 
 
+    def _normalize_gram(
+            self,
+            result: Tensor,
+            XX: Tensor,
+            YY: Tensor,
+            diag: bool,
+        ):
+        """
+        Normalizes a (possibly log space) Gram matrix given the diagonals
+        via K(X, Y) = K(X, Y) / sqrt(K(X, X) * K(Y, Y)).
+
+        Args:
+            result (Tensor): Tensor with shape (N1, N2, ...) or (N1, ...) 
+                if diag=True.
+            XX (Tensor): Diagonal k(X_i, X_i) with shape (N1, ...).
+            YY (Tensor): Diagonal k(Y_j, Y_j) with shape (N2, ...).
+            diag (bool): If True, 'result' is the diagonal k(X_i, Y_i).
+
+        Returns:
+            Tensor: Normalized tensor of the same shape as 'result'.
+        """
+        if not diag:
+            XX = XX[:, None] #shape (N1, 1, ...)
+            YY = YY[None, :] #shape (1, N2, ...)
+        if self.log_space:
+            return result - 0.5*XX - 0.5*YY
+        else:
+            return result / torch.sqrt(XX) / torch.sqrt(YY)
+
+
+    def gram_row_tiles(
+            self,
+            X: Tensor,
+            Y: Tensor,
+            row_batch: Optional[int] = None,
+            max_batch: Optional[int] = None,
+            normalize: Optional[bool] = None,
+            n_jobs: int = 1,
+            diagonals: Optional[Tuple[Tensor, Tensor]] = None,
+        ) -> Iterator[Tuple[int, Tensor]]:
+        """
+        Streams the Gram matrix k(X_i, Y_j) in tiles of 'row_batch' rows,
+        such that at most a (row_batch, N2, ...) tile is held in memory at
+        any given time. The diagonals needed for normalization are computed
+        once up front instead of once per tile.
+
+        Args:
+            X (Tensor): Tensor with shape (N1, T, d).
+            Y (Tensor): Tensor with shape (N2, T, d).
+            row_batch (Optional[int]): Number of rows of each tile. Defaults
+                to the max batch size.
+            max_batch (Optional[int]): Sets the max batch size if not None, 
+                else uses the default 'self.max_batch'.
+            normalize (Optional[bool]): If True, the kernel is normalized to
+                have unit diagonal. If None defaults to 'self.normalize'.
+            n_jobs (int): Number of parallel jobs to run in joblib.Parallel.
+            diagonals (Optional[Tuple[Tensor, Tensor]]): Precomputed 
+                unnormalized diagonals k(X_i, X_i) and k(Y_j, Y_j) used for
+                normalization, useful when tiles are requested repeatedly.
+
+        Yields:
+            Tuple[int, Tensor]: The index of the first row of the tile, and
+                the tile k(X[i:i+row_batch], Y) of shape (row_batch, N2, ...),
+                exponentiated if the kernel is computed in log space.
+        """
+        max_batch = max_batch if max_batch is not None else self.max_batch
+        normalize = normalize if normalize is not None else self.normalize
+        row_batch = row_batch if row_batch is not None else max_batch
+
+        if normalize and diagonals is not None:
+            XX, YY = diagonals
+        elif normalize:
+            YY = self._max_batched_gram(Y, Y, True, max_batch, False, n_jobs) #shape (N2, ...)
+            XX = YY if X is Y else None
+
+        for i in range(0, X.shape[0], row_batch):
+            x = X[i:i+row_batch]
+            tile = self._max_batched_gram(x, Y, False, max_batch, False, n_jobs)
+            if normalize:
+                xx = XX[i:i+row_batch] if XX is not None else \
+                    self._max_batched_gram(x, x, True, max_batch, False, n_jobs)
+                tile = self._normalize_gram(tile, xx, YY, False)
+            if self.log_space:
+                tile = torch.exp(tile)
+            yield i, tile
+
+
     @is_documented_by(_max_batched_gram)
     def __call__(
             self, 
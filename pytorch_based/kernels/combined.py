@@ -0,0 +1,211 @@
+from typing import List, Dict, Set, Any, Optional, Tuple, Literal, Callable, Iterator
+import torch
+from torch import Tensor
+from joblib import Parallel, delayed
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from kernels.abstract_base import TimeSeriesKernel
+
+#######################################################################################
+################### Weighted sum of time series kernels ###############################
+#######################################################################################
+
+
+class CombinedKernel(TimeSeriesKernel):
+    def __init__(
+            self,
+            kernels: List[TimeSeriesKernel],
+            weights: Optional[List[float]] = None,
+            max_batch: int = 1000,
+            normalize: bool = False,
+        ):
+        """
+        The weighted sum K(x, y) = sum_m w_m K_m(x, y) of scalar valued time
+        series kernels. All component kernels are evaluated on one shared tile
+        schedule, where each tile is computed for every component and then
+        accumulated in place into the output. Components with an explicit 
+        feature map, see 'TimeSeriesKernel._features', compute the features
+        of each series once per call and evaluate the tiles from them. 
+        Components with 'normalize=True' are normalized using diagonals 
+        computed once per call, and components in log space are 
+        exponentiated before summation. The weights can be
+        learned by kernel-target alignment via 'fit_alignment'.
+
+        Args:
+            kernels (List[TimeSeriesKernel]): Component kernels.
+            weights (Optional[List[float]]): Weight of each component.
+                Defaults to uniform weights 1/len(kernels).
+            max_batch (int, optional): Max batch size for computations.
+            normalize (bool, optional): If True, normalizes the combined kernel.
+        """
+        super().__init__(max_batch, normalize)
+        self.kernels = kernels
+        if weights is None:
+            weights = [1/len(kernels)] * len(kernels)
+        self.weights = list(weights)
+
+
+    def _diagonals(
+            self,
+            X: Tensor,
+            feats: List[Optional[Tensor]],
+            max_batch: int,
+            n_jobs: int,
+        ) -> List[Optional[Tensor]]:
+        """Unnormalized diagonals k_m(X_i, X_i) of the components which
+        require normalization, else None. Uses the features 'feats' of X
+        of the components which have a feature map."""
+        diagonals = []
+        for k, f in zip(self.kernels, feats):
+            if not k.normalize:
+                diagonals.append(None)
+            elif f is not None:
+                diagonals.append(k._feature_gram(f, f, True))
+            else:
+                diagonals.append(k._max_batched_gram(X, X, True, max_batch, False, n_jobs))
+        return diagonals
+
+
+    def _component_tiles(
+            self,
+            X: Tensor,
+            Y: Tensor,
+            diag: bool,
+            max_batch: int,
+            n_jobs: int,
+        ) -> Iterator[Tuple[slice, slice, List[Tensor]]]:
+        """
+        Iterates over the shared tile schedule, yielding the tile of every
+        component kernel, normalized and exponentiated if applicable.
+
+        Yields:
+            Tuple[slice, slice, List[Tensor]]: Rows and columns of the tile,
+                and the component tiles of shape (rows, cols) or (rows,)
+                if diag=True.
+        """
+        N1, N2 = X.shape[0], Y.shape[0]
+        feat_X = [k._features(X, max_batch, n_jobs) for k in self.kernels]
+        feat_Y = feat_X if X is Y else [k._features(Y, max_batch, n_jobs) for k in self.kernels]
+        XX = self._diagonals(X, feat_X, max_batch, n_jobs)
+        YY = XX if X is Y else self._diagonals(Y, feat_Y, max_batch, n_jobs)
+
+        for r0 in range(0, N1, max_batch):
+            r1 = min(r0 + max_batch, N1)
+            col_batch = max_batch if diag else max(1, max_batch // (r1-r0))
+            col_ranges = [(r0, r1)] if diag else \
+                [(c0, min(c0 + col_batch, N2)) for c0 in range(0, N2, col_batch)]
+            for c0, c1 in col_ranges:
+                x, y = X[r0:r1], Y[c0:c1]
+                tiles = Parallel(n_jobs=n_jobs)(
+                    delayed(k._gram)(x, y, diag) if fx is None else
+                    delayed(k._feature_gram)(fx[r0:r1], fy[c0:c1], diag)
+                    for k, fx, fy in zip(self.kernels, feat_X, feat_Y)
+                    )
+                for m, k in enumerate(self.kernels):
+                    if k.normalize:
+                        tiles[m] = k._normalize_gram(tiles[m], XX[m][r0:r1], YY[m][c0:c1], diag)
+                    if k.log_space:
+                        tiles[m] = torch.exp(tiles[m])
+                yield slice(r0, r1), slice(c0, c1), tiles
+
+
+    def _gram(
+            self,
+            X: Tensor,
+            Y: Tensor,
+            diag: bool,
+        ):
+        return self._max_batched_gram(X, Y, diag, None, False, 1)
+
+
+    def _max_batched_gram(
+            self,
+            X: Tensor,
+            Y: Tensor,
+            diag: bool,
+            max_batch: Optional[int],
+            normalize: Optional[bool],
+            n_jobs: int,
+        ):
+        N1, N2 = X.shape[0], Y.shape[0]
+        max_batch = max_batch if max_batch is not None else self.max_batch
+        normalize = normalize if normalize is not None else self.normalize
+
+        # accumulate weighted sum of component tiles in place
+        shape = (N1,) if diag else (N1, N2)
+        result = torch.zeros(shape, device=X.device, dtype=X.dtype)
+        for rows, cols, tiles in self._component_tiles(X, Y, diag, max_batch, n_jobs):
+            out = result[rows] if diag else result[rows, cols]
+            for w, tile in zip(self.weights, tiles):
+                out.add_(tile, alpha=w)
+
+        if normalize:
+            if X is Y:
+                XX = result if diag else torch.diagonal(result)
+                YY = XX
+            else:
+                XX = self._max_batched_gram(X, X, True, max_batch, False, n_jobs)
+                YY = self._max_batched_gram(Y, Y, True, max_batch, False, n_jobs)
+            result = self._normalize_gram(result, XX, YY, diag)
+        return result
+
+
+    def fit_alignment(
+            self,
+            X: Tensor,
+            y: Tensor,
+            classification: bool = True,
+            max_batch: Optional[int] = None,
+            n_jobs: int = 1,
+        ):
+        """
+        Sets the weights proportional to the centered kernel-target alignment
+        A(K_m, yy^T) = <K_m^c, T^c>_F / (||K_m^c||_F ||T^c||_F) of each
+        component, see https://jmlr.org/papers/v13/cortes12a.html, with
+        negative alignments clipped to zero. The alignment statistics are
+        accumulated over the shared tile schedule in a single pass, without
+        materializing any Gram matrix.
+
+        Args:
+            X (Tensor): Tensor with shape (N, T, d).
+            y (Tensor): Class labels or regression targets of shape (N,)
+                or (N, n_targets).
+            classification (bool): If True, the target kernel is built from
+                one-hot encoded labels.
+            max_batch (Optional[int]): Sets the max batch size if not None,
+                else uses the default 'self.max_batch'.
+            n_jobs (int): Number of parallel jobs to run in joblib.Parallel.
+        """
+        N = X.shape[0]
+        max_batch = max_batch if max_batch is not None else self.max_batch
+        y = torch.as_tensor(y, device=X.device)
+        if classification:
+            Yt = torch.nn.functional.one_hot(torch.unique(y, return_inverse=True)[1]).to(X.dtype)
+        else:
+            Yt = y.to(X.dtype).reshape(N, -1)
+        Yt = Yt - Yt.mean(dim=0, keepdim=True) # centered target T^c = Yt Yt^T
+
+        # <K, T^c>, ||K||^2 and row sums K1 per component
+        n_kernels = len(self.kernels)
+        KT = torch.zeros(n_kernels, device=X.device, dtype=X.dtype)
+        KK = torch.zeros(n_kernels, device=X.device, dtype=X.dtype)
+        K1 = torch.zeros(n_kernels, N, device=X.device, dtype=X.dtype)
+        for rows, cols, tiles in self._component_tiles(X, X, False, max_batch, n_jobs):
+            for m, tile in enumerate(tiles):
+                KT[m] += ((tile @ Yt[cols]) * Yt[rows]).sum()
+                KK[m] += (tile**2).sum()
+                K1[m, rows] += tile.sum(dim=1)
+
+        # ||HKH||^2 = ||K||^2 - 2/N ||K1||^2 + (1^T K 1)^2 / N^2
+        KcKc = KK - 2/N * (K1**2).sum(dim=1) + K1.sum(dim=1)**2 / N**2
+        TcTc = ((Yt.T @ Yt)**2).sum()
+        self.alignments = KT / torch.sqrt(KcKc * TcTc)
+        weights = torch.clamp(self.alignments, min=0)
+        if weights.sum() > 0:
+            weights = weights / weights.sum()
+        else:
+            weights = torch.full_like(weights, 1/n_kernels)
+        self.weights = weights.tolist()
+        return self
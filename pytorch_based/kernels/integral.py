@@ -14,34 +14,120 @@ from kernels.static_kernels import PolyKernel
 #######################################################################################
 
 
+def time_normalized_resample(
+        X: Tensor,
+        n_grid: int,
+    ):
+    """
+    Linearly interpolates each time series onto the uniform grid of 
+    'n_grid' points on [0, 1], where the observed points of each series 
+    are placed uniformly on [0, 1]. Ragged batches are supported by 
+    padding the end of shorter series with NaNs. Returns X unchanged 
+    if it is already of length 'n_grid' and contains no padding.
+
+    Args:
+        X (Tensor): Tensor of shape (N, T, d), possibly NaN padded.
+        n_grid (int): Number of grid points.
+
+    Returns:
+        Tensor: Tensor of shape (N, n_grid, d).
+    """
+    N, T, d = X.shape
+    isnan = torch.isnan(X).any(dim=-1) # shape (N, T)
+    if T == n_grid and not isnan.any():
+        return X
+
+    # position of each grid point in the index space of each series
+    lengths = (~isnan).sum(dim=-1, keepdim=True) # shape (N, 1)
+    u = torch.linspace(0, 1, n_grid, device=X.device, dtype=X.dtype)
+    pos = u[None, :] * (lengths - 1) # shape (N, n_grid)
+    i0 = torch.clamp(pos.floor().long(), min=0)
+    i0 = torch.minimum(i0, torch.clamp(lengths-2, min=0))
+    i1 = torch.minimum(i0+1, lengths-1)
+    frac = (pos - i0)[..., None] # shape (N, n_grid, 1)
+
+    X = torch.nan_to_num(X)
+    X0 = torch.gather(X, 1, i0[..., None].expand(N, n_grid, d))
+    X1 = torch.gather(X, 1, i1[..., None].expand(N, n_grid, d))
+    return X0 + frac * (X1 - X0)
+
+
+
 class StaticIntegralKernel(TimeSeriesKernel):
     def __init__(
             self,
             static_kernel:StaticKernel = PolyKernel(),
             max_batch:int = 10000,
             normalize:bool = False,
+            n_grid:int = 100,
+            time_chunk:int = 16,
         ):
         """
         The integral kernel K(x, y) = \int k(x_t, y_t) dt, given a static kernel 
-        k(x, y) on R^d.
+        k(x, y) on R^d. Time series are parametrized on [0, 1], and each 
+        series is linearly interpolated from its own valid length onto the 
+        fixed grid of 'n_grid' points, such that ragged batches padded at 
+        the end with NaNs are supported. As the grid does not depend on the 
+        inputs of each call, the value of a pair does not depend on the 
+        padding of its batch, and the normalization diagonals are computed
+        on the same grid as the cross terms. The trapezoidal rule is 
+        accumulated over chunks of 'time_chunk' timesteps, such that the 
+        full (N1, N2, T) tensor of static kernel evaluations is never 
+        materialized.
 
         Args:
             static_kernel (StaticKernel): Static kernel on R^d.
+            max_batch (int, optional): Max batch size for computations.
+            normalize (bool, optional): If True, normalizes the kernel.
+            n_grid (int): Number of points of the time grid. Series with 
+                exactly 'n_grid' timesteps and no padding are used as is.
+            time_chunk (int): Number of timesteps per accumulation step.
         """
         super().__init__(max_batch, normalize)
         self.static_kernel = static_kernel
+        self.n_grid = n_grid
+        self.time_chunk = time_chunk
 
 
-    #TODO implement for T1 != T2
     def _gram(
             self, 
             X: Tensor, 
             Y: Tensor,
             diag: bool,
         ):
-        # Shape (N, T)
-        ijKt = self.static_kernel(X, Y, diag)
+        # resample onto the time grid of the kernel
+        n_grid = self.n_grid
+        X = time_normalized_resample(X, n_grid)
+        Y = time_normalized_resample(Y, n_grid)
+
+        # trapezoidal weights on [0, 1]
+        if n_grid == 1:
+            weights = torch.ones(1, device=X.device, dtype=X.dtype)
+        else:
+            weights = torch.full((n_grid,), 1/(n_grid-1), device=X.device, dtype=X.dtype)
+            weights[0] = weights[-1] = 0.5/(n_grid-1)
 
         #return integral of k(x_t, y_t) dt for each pair x and y
-        T = X.shape[-2]
-        return torch.trapz(ijKt, dx=1/(T-1), axis=-1)
\ No newline at end of file
+        N1, N2 = X.shape[0], Y.shape[0]
+        shape = (N1,) if diag else (N1, N2)
+        result = torch.zeros(shape, device=X.device, dtype=X.dtype)
+        for t in range(0, n_grid, self.time_chunk):
+            ijKt = self.static_kernel(X[:, t:t+self.time_chunk], 
+                                      Y[:, t:t+self.time_chunk], diag) # shape (N1, N2, chunk) or (N1, chunk)
+            result += ijKt @ weights[t:t+self.time_chunk]
+        return result
+
+
+
+if __name__ == "__main__":
+    # sanity check: the normalized kernel of a series and its NaN padded 
+    # copy is 1, and the value of a pair does not depend on the padding
+    from kernels.static_kernels import LinearKernel
+    torch.manual_seed(0)
+    X = torch.randn(4, 8, 3, dtype=torch.float64)
+    X_pad = torch.cat([X, torch.full((4, 5, 3), float("nan"), dtype=X.dtype)], dim=1)
+    kernel = StaticIntegralKernel(LinearKernel(), normalize=True)
+    assert torch.allclose(torch.diagonal(kernel(X, X_pad)), torch.ones(4, dtype=X.dtype))
+    kernel = StaticIntegralKernel(LinearKernel())
+    assert torch.allclose(kernel(X, X), kernel(X_pad, X_pad))
+    print("ok")
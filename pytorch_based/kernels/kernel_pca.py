@@ -0,0 +1,183 @@
+from typing import List, Dict, Set, Any, Optional, Tuple, Literal, Callable
+import torch
+from torch import Tensor
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from kernels.abstract_base import TimeSeriesKernel
+
+#######################################################################################
+################### Kernel PCA via streamed randomized eigensolver ####################
+#######################################################################################
+
+
+class KernelPCA():
+    def __init__(
+            self,
+            kernel: TimeSeriesKernel,
+            n_components: int = 2,
+            n_oversamples: int = 10,
+            n_iter: int = 2,
+            center: bool = True,
+            row_batch: int = 256,
+            seed: int = 0,
+            n_jobs: int = 1,
+        ):
+        """
+        Kernel PCA for time series kernels, computed with a randomized block
+        subspace iteration (see Algo 4.4 and 5.3 in https://arxiv.org/abs/0909.4061)
+        whose matrix products K @ V stream the Gram matrix in row tiles via
+        'TimeSeriesKernel.gram_row_tiles'. The full N x N Gram matrix is never
+        materialized, giving O(N * (n_components + n_oversamples) + row_batch * N)
+        memory. Fitting requires 'n_iter' + 2 passes over the Gram matrix.
+
+        Args:
+            kernel (TimeSeriesKernel): Time series kernel.
+            n_components (int): Number of eigenpairs to compute.
+            n_oversamples (int): Additional random directions used in the
+                block iteration for improved accuracy.
+            n_iter (int): Number of power iterations.
+            center (bool): If True, centers the kernel in feature space.
+            row_batch (int): Number of rows in each streamed Gram tile.
+            seed (int): Random seed for the initial random block.
+            n_jobs (int): Number of parallel jobs used by the kernel.
+        """
+        self.kernel = kernel
+        self.n_components = n_components
+        self.n_oversamples = n_oversamples
+        self.n_iter = n_iter
+        self.center = center
+        self.row_batch = row_batch
+        self.seed = seed
+        self.n_jobs = n_jobs
+
+
+    def _kernel_matmul(
+            self,
+            X: Tensor,
+            Y: Tensor,
+            V: Tensor,
+        ):
+        """
+        Computes K(X, Y) @ V by streaming the Gram matrix in row tiles.
+
+        Args:
+            X (Tensor): Tensor with shape (N1, T, d).
+            Y (Tensor): Tensor with shape (N2, T, d).
+            V (Tensor): Tensor with shape (N2, k).
+
+        Returns:
+            Tensor: Tensor with shape (N1, k).
+        """
+        out = torch.empty(X.shape[0], V.shape[1], device=V.device, dtype=V.dtype)
+        for i, tile in self.kernel.gram_row_tiles(X, Y, self.row_batch, n_jobs=self.n_jobs):
+            assert tile.ndim == 2, "KernelPCA requires a scalar valued kernel."
+            out[i:i+tile.shape[0]] = tile @ V
+        return out
+
+
+    def _centered_matmul(
+            self,
+            X: Tensor,
+            V: Tensor,
+        ):
+        """
+        Computes HKH @ V for H = I - 11^T/N, where K = K(X, X),
+        if self.center=True, else K @ V.
+        """
+        if not self.center:
+            return self._kernel_matmul(X, X, V)
+        KV = self._kernel_matmul(X, X, V - V.mean(dim=0, keepdim=True))
+        return KV - KV.mean(dim=0, keepdim=True)
+
+
+    def fit(
+            self,
+            X: Tensor,
+            y=None,
+        ):
+        """
+        Computes the top 'n_components' eigenpairs of the (centered) Gram
+        matrix K(X, X).
+
+        Args:
+            X (Tensor): Tensor with shape (N, T, d).
+        """
+        N = X.shape[0]
+        l = min(self.n_components + self.n_oversamples, N)
+        gen = torch.Generator(device=X.device).manual_seed(self.seed)
+        Omega = torch.randn(N, l, device=X.device, dtype=X.dtype, generator=gen)
+
+        # range finder with power iterations
+        Q, _ = torch.linalg.qr(self._centered_matmul(X, Omega))
+        for _ in range(self.n_iter):
+            Q, _ = torch.linalg.qr(self._centered_matmul(X, Q))
+
+        # Rayleigh-Ritz on the subspace. The kernel row means needed for
+        # out-of-sample centering are obtained in the same pass.
+        ones = torch.ones(N, 1, device=X.device, dtype=X.dtype)
+        if self.center:
+            KV = self._kernel_matmul(X, X, torch.cat([Q - Q.mean(dim=0, keepdim=True), ones], dim=1))
+            KQ = KV[:, :-1] - KV[:, :-1].mean(dim=0, keepdim=True)
+            self.K_row_means = KV[:, -1] / N #shape (N,)
+            self.K_mean = self.K_row_means.mean()
+        else:
+            KQ = self._kernel_matmul(X, X, Q)
+        B = Q.T @ KQ
+        eigenvalues, U = torch.linalg.eigh((B + B.T) / 2)
+
+        # descending order
+        eigenvalues = eigenvalues.flip(0)[:self.n_components]
+        U = U.flip(1)[:, :self.n_components]
+        self.eigenvalues = eigenvalues
+        self.eigenvectors = Q @ U #shape (N, n_components)
+        self.alphas = self.eigenvectors / torch.sqrt(torch.clamp(eigenvalues, min=1e-12))
+        self.X_fit = X
+        return self
+
+
+    def transform(
+            self,
+            X: Tensor,
+        ):
+        """
+        Projects (possibly out-of-sample) time series onto the principal
+        components, streaming K(X, X_fit) in row tiles.
+
+        Args:
+            X (Tensor): Tensor with shape (N2, T, d).
+
+        Returns:
+            Tensor: Tensor with shape (N2, n_components).
+        """
+        if not self.center:
+            return self._kernel_matmul(X, self.X_fit, self.alphas)
+
+        # K_c(x, X_j) = K(x, X_j) - mean_k K(x, X_k) - mean_k K(X_k, X_j) + mean(K)
+        N = self.X_fit.shape[0]
+        ones = torch.ones(N, 1, device=X.device, dtype=X.dtype)
+        KV = self._kernel_matmul(X, self.X_fit, torch.cat([self.alphas, ones], dim=1))
+        x_means = KV[:, -1:] / N #shape (N2, 1)
+        offset = self.K_row_means @ self.alphas #shape (n_components,)
+        return KV[:, :-1] - x_means * self.alphas.sum(dim=0) - offset \
+            + self.K_mean * self.alphas.sum(dim=0)
+
+
+    def fit_transform(
+            self,
+            X: Tensor,
+            y=None,
+        ):
+        """
+        Fits the model and returns the projections of the training data,
+        which equal eigenvectors * sqrt(eigenvalues).
+
+        Args:
+            X (Tensor): Tensor with shape (N, T, d).
+
+        Returns:
+            Tensor: Tensor with shape (N, n_components).
+        """
+        self.fit(X)
+        return self.eigenvectors * torch.sqrt(torch.clamp(self.eigenvalues, min=0))
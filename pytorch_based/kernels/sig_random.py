@@ -4,6 +4,8 @@ from torch import Tensor
 from torch.nn.functional import relu
 from torch.nn.functional import tanh
 import numpy as np
+from joblib import Parallel, delayed
+import weakref
 
 import os
 import sys
@@ -22,7 +24,10 @@ def randomized_sig_tanh(
     ):
     """
     Randomized signature of a (batched) time series X, with tanh
-    activation function.
+    activation function. Each step y[t+1] = y[t] + sum_k (tanh(y[t]) A_k 
+    + b_k) dx_k is accumulated in place one channel k at a time, using
+    (N, M) x (M, M) matmuls, such that only O(N*M) memory is used per 
+    step instead of materializing the (N, M, d) tensor tanh(y[t]) A.
 
     Args:
         X (Tensor): Input tensor of shape (N, T, d).
@@ -33,14 +38,16 @@ def randomized_sig_tanh(
     """
     N, T, d = X.shape
     diff = X.diff(dim=1) # shape (N, T-1, d)
-    Y_0 = torch.tile(Y_0, (N, 1)) # shape (N, M)
+    A_k = A.permute(2, 0, 1).contiguous() # shape (d, M, M)
+    Y = torch.tile(Y_0, (N, 1)) # shape (N, M)
 
     #iterate y[t+1] = y[t] + ...
-    Z = torch.tensordot(tanh(Y_0), A, dims=1) + b[None] # shape (N, M, d)
-    Y = Y_0 + (Z * diff[:, 0:1, :]).sum(dim=-1) # shape (N, M)
-    for t in range(1, T-1):
-        Z = torch.tensordot(tanh(Y), A, dims=1) + b[None]
-        Y = Y + (Z * diff[:, t:t+1, :]).sum(dim=-1)
+    for t in range(T-1):
+        dx = diff[:, t] # shape (N, d)
+        tanh_Y = tanh(Y)
+        Y = torch.addmm(Y, dx, b.T)
+        for k in range(d):
+            Y.addcmul_(tanh_Y @ A_k[k], dx[:, k:k+1])
     return Y
 
 
@@ -67,6 +74,9 @@ class RandomizedSigKernel(TimeSeriesKernel):
         self.n_features = n_features
         self.seed = seed
         self.has_initialized = False
+        self._cache_ref = None
+        self._cache_version = None
+        self._cache_features = None
 
 
     def _init_given_input(
@@ -111,19 +121,86 @@ class RandomizedSigKernel(TimeSeriesKernel):
         self.has_initialized = True
         
 
-    def _gram(
-            self, 
-            X: Tensor, 
-            Y: Tensor,
-            diag: bool,
+    def _features(
+            self,
+            X: Tensor,
+            max_batch: int,
+            n_jobs: int,
         ):
+        """
+        Computes the randomized signature of each time series exactly once,
+        in chunks of size 'max_batch'. The features of the most recent input
+        are cached, such that repeated calls with the same tensor, as with 
+        the columns in 'gram_row_tiles', do not recompute them. The cache 
+        is keyed on the identity of the tensor through a weak reference, 
+        and on its version counter to detect in-place modifications.
+
+        Args:
+            X (Tensor): Tensor of shape (N, T, d).
+            max_batch (int): Chunk size for the feature computation.
+            n_jobs (int): Number of parallel jobs to run in joblib.Parallel.
+
+        Returns:
+            Tensor: Tensor of shape (N, n_features).
+        """
         if not self.has_initialized:
             self._init_given_input(X)
+        cached_X = self._cache_ref() if self._cache_ref is not None else None
+        if cached_X is X and X._version == self._cache_version:
+            return self._cache_features
+
+        features = Parallel(n_jobs=n_jobs, prefer="threads")(
+            delayed(randomized_sig_tanh)(x, self.A, self.b, self.Y_0)
+            for x in torch.split(X, max_batch, dim=0)
+            )
+        features = torch.cat(features, dim=0)
+        self._cache_ref = weakref.ref(X)
+        self._cache_version = X._version
+        self._cache_features = features
+        return features
         
-        feat_X = randomized_sig_tanh(X, self.A, self.b, self.Y_0)
-        feat_Y = randomized_sig_tanh(Y, self.A, self.b, self.Y_0)
 
+    def _feature_gram(
+            self,
+            feat_X: Tensor,
+            feat_Y: Tensor,
+            diag: bool,
+        ):
         if diag:
             return (feat_X * feat_Y).mean(dim=-1)
-        else:
-            return feat_X @ feat_Y.t() / self.n_features
\ No newline at end of file
+        return feat_X @ feat_Y.t() / self.n_features
+
+
+    def _gram(
+            self, 
+            X: Tensor, 
+            Y: Tensor,
+            diag: bool,
+        ):
+        return self._max_batched_gram(X, Y, diag, None, False, 1)
+
+
+    def _max_batched_gram(
+            self,
+            X: Tensor,
+            Y: Tensor,
+            diag: bool,
+            max_batch: Optional[int],
+            normalize: Optional[bool],
+            n_jobs: int,
+        ):
+        max_batch = max_batch if max_batch is not None else self.max_batch
+        normalize = normalize if normalize is not None else self.normalize
+
+        # features are computed once per series, then a single GEMM
+        feat_Y = self._features(Y, max_batch, n_jobs)
+        feat_X = feat_Y if X is Y else \
+            torch.cat([randomized_sig_tanh(x, self.A, self.b, self.Y_0)
+                       for x in torch.split(X, max_batch, dim=0)], dim=0)
+        result = self._feature_gram(feat_X, feat_Y, diag)
+
+        if normalize:
+            XX = (feat_X**2).mean(dim=-1)
+            YY = (feat_Y**2).mean(dim=-1)
+            result = self._normalize_gram(result, XX, YY, diag)
+        return result
@@ -0,0 +1,288 @@
+from typing import List, Dict, Set, Any, Optional, Tuple, Literal, Callable
+from collections import OrderedDict
+import torch
+from torch import Tensor
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from kernels.abstract_base import TimeSeriesKernel
+
+#######################################################################################
+################### LRU cache of Gram matrix rows #####################################
+#######################################################################################
+
+
+class KernelRowCache():
+    def __init__(
+            self,
+            kernel: TimeSeriesKernel,
+            X: Tensor,
+            cache_size_mb: float = 1024,
+            row_batch: int = 64,
+            n_jobs: int = 1,
+        ):
+        """
+        Least recently used cache of rows k(X_i, X) of the Gram matrix of a
+        time series kernel, bounded by a memory budget. Rows missing from the
+        cache are computed in batches of up to 'row_batch' rows through
+        'TimeSeriesKernel.gram_row_tiles', where the remaining slots of a batch
+        are filled with rows likely to be requested next.
+
+        Args:
+            kernel (TimeSeriesKernel): Scalar valued time series kernel.
+            X (Tensor): Tensor with shape (N, T, d).
+            cache_size_mb (float): Memory budget of the cache in megabytes.
+            row_batch (int): Max number of rows computed in one tile.
+            n_jobs (int): Number of parallel jobs used by the kernel.
+        """
+        self.kernel = kernel
+        self.X = X
+        self.row_batch = row_batch
+        self.n_jobs = n_jobs
+        self.rows: OrderedDict[int, Tensor] = OrderedDict()
+        N = X.shape[0]
+        self.max_rows = max(2, int(cache_size_mb * 2**20 // (N * X.element_size())))
+
+        # unnormalized diagonal, reused for normalization of every tile
+        self.raw_diag = kernel._max_batched_gram(X, X, True, None, False, n_jobs)
+        if kernel.normalize:
+            self.diag = torch.ones_like(self.raw_diag)
+        elif kernel.log_space:
+            self.diag = torch.exp(self.raw_diag)
+        else:
+            self.diag = self.raw_diag
+
+
+    def get_rows(
+            self,
+            indices: List[int],
+            prefetch_scores: Optional[Tensor] = None,
+        ):
+        """
+        Returns the rows k(X_i, X) for i in 'indices'. On a cache miss, the
+        remaining slots of the batch are filled with the uncached rows of
+        highest finite score, found with a top-k instead of a full sort.
+
+        Args:
+            indices (List[int]): Indices of the requested rows.
+            prefetch_scores (Optional[Tensor]): Scores of shape (N,) of the
+                rows to compute alongside any cache misses. Rows with 
+                non-finite scores are never prefetched.
+
+        Returns:
+            Tensor: Tensor with shape (len(indices), N).
+        """
+        missing = [i for i in dict.fromkeys(indices) if i not in self.rows]
+        if missing:
+            n_free = min(self.row_batch, self.max_rows) - len(missing)
+            if prefetch_scores is not None and n_free > 0:
+                scores = prefetch_scores.clone()
+                taken = list(self.rows.keys()) + missing
+                scores[torch.tensor(taken, device=scores.device)] = -torch.inf
+                top = scores.topk(min(n_free, scores.shape[0]))
+                missing += top.indices[torch.isfinite(top.values)].tolist()
+            self._compute_rows(missing)
+
+        out = []
+        for i in indices:
+            self.rows.move_to_end(i)
+            out.append(self.rows[i])
+        out = torch.stack(out)
+
+        # evict least recently used rows
+        while len(self.rows) > self.max_rows:
+            self.rows.popitem(last=False)
+        return out
+
+
+    def _compute_rows(
+            self,
+            indices: List[int],
+        ):
+        """Computes the rows k(X_i, X) in tiles and stores them in the cache."""
+        idx = torch.tensor(indices, device=self.X.device)
+        diagonals = (self.raw_diag[idx], self.raw_diag)
+        tiles = self.kernel.gram_row_tiles(self.X[idx], self.X, self.row_batch,
+                                           n_jobs=self.n_jobs, diagonals=diagonals)
+        for i, tile in tiles:
+            assert tile.ndim == 2, "KernelRowCache requires a scalar valued kernel."
+            for r, row in enumerate(tile):
+                self.rows[indices[i+r]] = row
+
+#######################################################################################
+################### SMO kernel support vector classifier ##############################
+#######################################################################################
+
+
+class KernelSVC():
+    def __init__(
+            self,
+            kernel: TimeSeriesKernel,
+            C: float = 1.0,
+            tol: float = 1e-3,
+            max_iter: int = 100000,
+            cache_size_mb: float = 1024,
+            row_batch: int = 64,
+            n_jobs: int = 1,
+        ):
+        """
+        Kernel support vector classifier for time series kernels, solved
+        with SMO using second order working set selection as in LIBSVM, see
+        https://www.jmlr.org/papers/volume6/fan05a/fan05a.pdf. Kernel rows
+        are requested on demand and kept in a 'KernelRowCache', such that the
+        full Gram matrix is never materialized. Multiclass problems are solved
+        one-vs-rest, with all binary problems sharing the same row cache.
+
+        Args:
+            kernel (TimeSeriesKernel): Scalar valued time series kernel.
+            C (float): Regularization parameter.
+            tol (float): Tolerance of the KKT violation stopping criterion.
+            max_iter (int): Max number of SMO iterations per binary problem.
+            cache_size_mb (float): Memory budget of the row cache in megabytes.
+            row_batch (int): Max number of kernel rows computed in one tile.
+            n_jobs (int): Number of parallel jobs used by the kernel.
+        """
+        self.kernel = kernel
+        self.C = C
+        self.tol = tol
+        self.max_iter = max_iter
+        self.cache_size_mb = cache_size_mb
+        self.row_batch = row_batch
+        self.n_jobs = n_jobs
+
+
+    def _solve_binary(
+            self,
+            cache: KernelRowCache,
+            y: Tensor,
+        ):
+        """
+        Solves the SVM dual min 0.5 a^T Q a - e^T a s.t. y^T a = 0,
+        0 <= a <= C, where Q_ij = y_i y_j K_ij.
+
+        Args:
+            cache (KernelRowCache): Row cache of the Gram matrix.
+            y (Tensor): Labels in {-1, +1} of shape (N,).
+
+        Returns:
+            Tuple[Tensor, float]: Dual coefficients alpha of shape (N,)
+                and intercept.
+        """
+        C, TAU = self.C, 1e-12
+        diag = cache.diag
+        alpha = torch.zeros_like(y)
+        G = -torch.ones_like(y) # gradient Q @ alpha - e
+        for _ in range(self.max_iter):
+            up = ((y > 0) & (alpha < C)) | ((y < 0) & (alpha > 0))
+            low = ((y < 0) & (alpha < C)) | ((y > 0) & (alpha > 0))
+            minus_yG = -y * G
+            m_up = torch.where(up, minus_yG, -torch.inf)
+            m_low = torch.where(low, minus_yG, torch.inf)
+            i = int(m_up.argmax())
+            if m_up[i] - m_low.min() < self.tol:
+                break
+
+            # second order selection of j
+            K_i = cache.get_rows([i], prefetch_scores=m_up)[0]
+            b = m_up[i] - minus_yG
+            a = torch.clamp(diag[i] + diag - 2*K_i, min=TAU)
+            obj = torch.where(low & (b > 0), -b**2 / a, torch.inf)
+            j = int(obj.argmin())
+            K_j = cache.get_rows([j], prefetch_scores=-m_low)[0]
+
+            # a_i += y_i * lam, a_j -= y_j * lam, clipped to the box
+            lam = b[j] / a[j]
+            lam = torch.minimum(lam, C - alpha[i] if y[i] > 0 else alpha[i])
+            lam = torch.minimum(lam, alpha[j] if y[j] > 0 else C - alpha[j])
+            alpha[i] += y[i] * lam
+            alpha[j] -= y[j] * lam
+            G += lam * y * (K_i - K_j)
+
+        # intercept from free support vectors
+        yG = y * G
+        free = (alpha > 0) & (alpha < C)
+        if free.any():
+            rho = yG[free].mean()
+        else:
+            up = ((y > 0) & (alpha < C)) | ((y < 0) & (alpha > 0))
+            low = ((y < 0) & (alpha < C)) | ((y > 0) & (alpha > 0))
+            rho = (torch.where(up, yG, torch.inf).min() + torch.where(low, yG, -torch.inf).max()) / 2
+        return alpha, float(-rho)
+
+
+    def fit(
+            self,
+            X: Tensor,
+            y: Tensor,
+        ):
+        """
+        Fits the classifier.
+
+        Args:
+            X (Tensor): Tensor with shape (N, T, d).
+            y (Tensor): Class labels of shape (N,).
+        """
+        y = torch.as_tensor(y, device=X.device)
+        self.classes = torch.unique(y)
+        cache = KernelRowCache(self.kernel, X, self.cache_size_mb,
+                               self.row_batch, self.n_jobs)
+
+        # one-vs-rest, or a single problem for binary classification
+        positives = self.classes[1:] if len(self.classes) == 2 else self.classes
+        coefs, intercepts = [], []
+        for c in positives:
+            y_pm = torch.where(y == c, 1.0, -1.0).to(X.dtype)
+            alpha, intercept = self._solve_binary(cache, y_pm)
+            coefs.append(alpha * y_pm)
+            intercepts.append(intercept)
+        coefs = torch.stack(coefs, dim=1) #shape (N, n_problems)
+
+        # keep support vectors only
+        support = (coefs != 0).any(dim=1)
+        self.support_ = torch.nonzero(support).squeeze(-1)
+        self.X_support = X[support]
+        self.dual_coef = coefs[support]
+        self.intercept = torch.tensor(intercepts, device=X.device, dtype=X.dtype)
+        return self
+
+
+    def decision_function(
+            self,
+            X: Tensor,
+        ):
+        """
+        Computes f(x) = sum_i alpha_i y_i k(x_i, x) + b over the support
+        vectors, streaming the kernel in row tiles.
+
+        Args:
+            X (Tensor): Tensor with shape (N2, T, d).
+
+        Returns:
+            Tensor: Tensor with shape (N2,) for binary problems, else
+                (N2, n_classes).
+        """
+        out = torch.empty(X.shape[0], self.dual_coef.shape[1], device=X.device, dtype=X.dtype)
+        tiles = self.kernel.gram_row_tiles(X, self.X_support, self.row_batch, n_jobs=self.n_jobs)
+        for i, tile in tiles:
+            out[i:i+tile.shape[0]] = tile @ self.dual_coef + self.intercept
+        return out[:, 0] if len(self.classes) == 2 else out
+
+
+    def predict(
+            self,
+            X: Tensor,
+        ):
+        """
+        Predicts class labels.
+
+        Args:
+            X (Tensor): Tensor with shape (N2, T, d).
+
+        Returns:
+            Tensor: Predicted labels of shape (N2,).
+        """
+        scores = self.decision_function(X)
+        if len(self.classes) == 2:
+            return self.classes[(scores > 0).long()]
+        return self.classes[scores.argmax(dim=1)]
@@ -3,6 +3,7 @@ import os
 import sys
 # sys.path.append(os.path.dirname(os.getcwd()))
 # sys.path.append(os.path.dirname(os.path.dirname(os.getcwd())))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import numpy as np
 import torch
@@ -11,6 +12,7 @@ import torch.functional as F
 from torch import Tensor
 
 from ridge_loocv import fit_ridge_LOOCV
+from features.rocket_convs import sampled_conv_quantiles, dilated_conv_chunks
 
 
 def apply_chunked(fn: Callable, X: Tensor, chunk_size: int=1000):
@@ -31,8 +33,23 @@ def apply_chunked(fn: Callable, X: Tensor, chunk_size: int=1000):
 
 
 class RocketFeatures(nn.Module):
-    def __init__(self, D, T, n_kernels, kernel_length=9, seed=0):
+    def __init__(self, D, T, n_kernels, kernel_length=9, seed=0, mode="conv"):
+        """ROCKET convolutions with dilations 2^0, ..., 2^max_exponent,
+        followed by PPV pooling.
+
+        Args:
+            D (int): Number of input channels.
+            T (int): Length of the time series.
+            n_kernels (int): Approximate number of kernels.
+            kernel_length (int): Length of the convolution kernels.
+            seed (int): Unused.
+            mode (Literal["conv", "unfold", "fft"]): Executes one Conv1d per
+                dilation ("conv"), or all dilations at once as a batched
+                GEMM ("unfold") or in the Fourier domain ("fft"), see
+                'dilated_conv_chunks'.
+        """
         super(RocketFeatures, self).__init__()
+        self.mode = mode
 
         max_exponent = np.floor(np.log2((T - 1) / (kernel_length- 1))).astype(np.int64)
         dilations = 2**np.arange(max_exponent + 1)
@@ -52,38 +69,34 @@ class RocketFeatures(nn.Module):
         )
 
     
-    def init_biases(self, X: Tensor, chunk_size: int=1000):
+    def init_biases(self, X: Tensor, chunk_size: int=1000, n_samples: int=2000):
         """Initializes the biases of the convolutional layers,
-        using the quantiles of the data. Assumes the data to
-        be shuffled.
-
-        WARNING: Slow even for 10 points, 10 000 kernels, T=113. (1.3s elapsed)
+        using random quantiles of the convolution outputs on the 
+        data, estimated from a sample of about 'n_samples' outputs 
+        per kernel, see 'sampled_conv_quantiles'.
 
         Args:
             X (Tensor): Shape (N, D, T).
             chunk_size (int): Batch size for computations
+            n_samples (int): Number of sampled outputs per kernel.
         """
         with torch.no_grad():
-            # first set the biases to zero
             for conv in self.convs:
-                conv.bias.data.zero_()
-
-            #obtain output
-            out_per_conv = [apply_chunked(conv, X, chunk_size) for conv in self.convs]
-
-            #initalize bias using random quantiles
-            for out, conv in zip(out_per_conv, self.convs):
-                #out: (N, n_kernels_per_dilation, T)
-                n_ker_per_dil = out.shape[1]
-                quantiles = 0.8 * torch.rand(n_ker_per_dil, device=X.device) + 0.1
-                q = torch.quantile(out.permute(0,2,1).reshape(-1, n_ker_per_dil), quantiles, dim=0)
-                conv.bias.data = torch.diag(q)
+                quantiles = 0.8 * torch.rand(conv.out_channels, device=X.device) + 0.1
+                conv.bias.data = sampled_conv_quantiles(conv, X, quantiles, chunk_size, n_samples)
 
         return self
 
     
     def forward(self, x): # can be made more memory efficient, as we don't need to store all the intermediate results
         # x: (N, D, T)
+        if self.mode != "conv":
+            N = x.shape[0]
+            out = torch.empty(N, len(self.convs), self.convs[0].out_channels,
+                              device=x.device, dtype=x.dtype)
+            for c0, c1, h in dilated_conv_chunks(self.convs, x, self.mode):
+                out[:, :, c0:c1] = torch.mean((h>0), dim=-1, dtype=x.dtype)
+            return out.reshape(N, -1)
         x = [conv(x) for conv in self.convs]
         x = torch.cat(x, dim=1)
         x = torch.mean((x>0), dim=-1, dtype=x.dtype)
@@ -93,9 +106,9 @@ class RocketFeatures(nn.Module):
 
 
 class Rocket(nn.Module):
-    def __init__(self, D, T, n_kernels, n_out, kernel_length=9, seed=0):
+    def __init__(self, D, T, n_kernels, n_out, kernel_length=9, seed=0, mode="conv"):
         super(Rocket, self).__init__()
-        self.rocket_features = RocketFeatures(D, T, n_kernels, kernel_length, seed)
+        self.rocket_features = RocketFeatures(D, T, n_kernels, kernel_length, seed, mode)
         self.linear = nn.Linear(self.rocket_features.n_kernels, n_out)
 
     def init_biases(self, X: Tensor, chunk_size: int=1000):